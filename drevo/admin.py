@@ -229,6 +229,7 @@ admin.site.register(ZnRating, ZnRatingAdmin)
 
 class CommentAnswersInline(admin.TabularInline):
     model = Comment
+    fk_name = 'parent'
     ordering = ('-created_at',)
     extra = 0
     readonly_fields = ('author', 'parent', 'znanie', 'content',
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DrevoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drevo'
+
+    def ready(self):
+        from . import lookups, signals  # noqa: F401
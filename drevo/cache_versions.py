@@ -0,0 +1,22 @@
+"""
+Версии закэшированных данных.
+
+Номер версии входит в ключи кэша группы данных. Чтобы сделать устаревшими
+все данные группы, достаточно сменить номер версии, не удаляя ключи:
+старые значения перестанут запрашиваться и будут вытеснены из кэша.
+"""
+import uuid
+
+from django.core.cache import cache
+
+
+def get_cache_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(key, version, None)
+    return version
+
+
+def bump_cache_version(key):
+    cache.set(key, uuid.uuid4().hex, None)
@@ -0,0 +1,59 @@
+"""
+Данные дерева категорий для главной страницы (см. DrevoView).
+
+Дерево строится двумя запросами и хранится в кэше. Публикация, изменение,
+удаление и перемещение категорий и знаний (см. drevo/signals.py) меняют
+номер версии, входящий в ключ, поэтому дерево строится заново только
+после изменений.
+"""
+from django.core.cache import cache
+
+from .cache_versions import bump_cache_version, get_cache_version
+from .models import Category, Znanie
+
+# Время хранения дерева в кэше, сек.
+CACHE_TIMEOUT = 60 * 60 * 24
+CACHE_PREFIX = 'category_tree'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+
+
+def build_category_tree():
+    """
+    Возвращает кортеж (список опубликованных категорий в порядке дерева,
+    словарь {id категории: [опубликованные знания категории]}).
+    У категорий устанавливается признак has_published_subcategories.
+    """
+    # формирует список категорий (один запрос)
+    categories = list(Category.tree_objects.filter(is_published=True))
+
+    # у категории есть опубликованные подкатегории, если она является
+    # родителем какой-либо из опубликованных категорий
+    parent_ids = {category.parent_id for category in categories}
+    for category in categories:
+        category.has_published_subcategories = category.pk in parent_ids
+
+    # формирование списков Знаний по id категорий (один запрос)
+    zn_dict = {category.pk: [] for category in categories}
+    knowledges = (Znanie.published
+                  .filter(category_id__in=zn_dict)
+                  .order_by('-order')
+                  .only('pk', 'name', 'category_id'))
+    for knowledge in knowledges:
+        zn_dict[knowledge.category_id].append(knowledge)
+    return categories, zn_dict
+
+
+def get_category_tree():
+    """
+    Возвращает закэшированный результат build_category_tree.
+    """
+    key = f'{CACHE_PREFIX}:{get_cache_version(VERSION_KEY)}'
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(key, tree, CACHE_TIMEOUT)
+    return tree
+
+
+def invalidate_category_tree():
+    bump_cache_version(VERSION_KEY)
@@ -0,0 +1,116 @@
+"""
+Загрузка страниц комментариев знания вместе с деревом ответов.
+
+Страница корневых комментариев выбирается по ключу (id меньше id
+последнего комментария предыдущей страницы), запрашивается на одну
+запись больше размера страницы, чтобы без отдельного запроса определить,
+что страница последняя. Ответы на все комментарии страницы загружаются
+одним запросом по корневым комментариям веток (Comment.root), дерево
+собирается в памяти, поэтому шаблоны обращаются к ответам
+(Comment.get_answers) без запросов к базе.
+
+Отрисованные страницы хранятся в кэше по знанию, курсору страницы
+и признаку аутентификации пользователя. Номер версии комментариев знания
+входит в ключ и меняется при создании, изменении (в т.ч. снятии
+с публикации) и удалении комментариев (см. drevo/signals.py).
+"""
+import collections
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .cache_versions import bump_cache_version, get_cache_version
+from .models import Comment
+
+# Время хранения отрисованных страниц в кэше, сек.
+# Ограничивает устаревание относительного времени комментариев
+# и данных их авторов.
+CACHE_TIMEOUT = 60 * 5
+CACHE_PREFIX = 'comments'
+
+
+def get_comments_queryset():
+    return Comment.objects.select_related('author__profile')
+
+
+def prefetch_answers(comments):
+    """
+    Загружает ответы на корневые комментарии comments на всю глубину
+    веток одним запросом.
+    """
+    comments = list(comments)
+    by_parent = collections.defaultdict(list)
+    answers = (get_comments_queryset()
+               .filter(root_id__in=[comment.pk for comment in comments])
+               .exclude(parent=None))
+    for answer in answers:
+        by_parent[answer.parent_id].append(answer)
+
+    level = comments
+    while level:
+        next_level = []
+        for comment in level:
+            comment.thread_answers = by_parent.get(comment.pk, [])
+            for answer in comment.thread_answers:
+                answer.parent = comment
+            next_level.extend(comment.thread_answers)
+        level = next_level
+
+
+def get_comments_page(znanie, last_comment_id=None, limit=Comment.COMMENTS_PER_PAGE):
+    """
+    Возвращает кортеж (список корневых комментариев знания с загруженными
+    ответами, признак последней страницы). Страница начинается после
+    комментария last_comment_id (None - первая страница).
+    """
+    comments = get_comments_queryset().filter(znanie=znanie, parent=None)
+    if last_comment_id:
+        comments = comments.filter(id__lt=last_comment_id)
+    comments = list(comments.order_by('-id')[:limit + 1])
+    is_last_page = len(comments) <= limit
+    comments = comments[:limit]
+    prefetch_answers(comments)
+    return comments, is_last_page
+
+
+def render_comments_page(znanie, last_comment_id=None, is_authenticated=False):
+    """
+    Возвращает кортеж (html страницы комментариев знания, признак
+    последней страницы).
+    """
+    offset = Comment.COMMENTS_PER_PAGE
+    comments, is_last_page = get_comments_page(znanie, last_comment_id, limit=offset)
+    if not comments:
+        return render_to_string('drevo/comments_list.html'), True
+
+    context = {
+        'comments': comments,
+        'comment_max_length': Comment.CONTENT_MAX_LENGTH,
+        'is_authenticated': is_authenticated,
+        'offset': offset,
+        'is_first_page': not last_comment_id,
+        'is_last_page': is_last_page,
+    }
+    return render_to_string('drevo/comments_list.html', context), is_last_page
+
+
+def get_rendered_comments_page(znanie, last_comment_id=None, is_authenticated=False):
+    """
+    Возвращает закэшированный результат render_comments_page.
+    """
+    version = get_cache_version(get_version_key(znanie.pk))
+    key = (f'{CACHE_PREFIX}:{version}:{znanie.pk}:'
+           f'{last_comment_id or 0}:{int(bool(is_authenticated))}')
+    page = cache.get(key)
+    if page is None:
+        page = render_comments_page(znanie, last_comment_id, is_authenticated)
+        cache.set(key, page, CACHE_TIMEOUT)
+    return page
+
+
+def get_version_key(znanie_id):
+    return f'{CACHE_PREFIX}:version:{znanie_id}'
+
+
+def invalidate_comments_cache(znanie_id):
+    bump_cache_version(get_version_key(znanie_id))
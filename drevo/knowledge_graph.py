@@ -0,0 +1,188 @@
+"""
+Снимок графа знаний в памяти процесса.
+
+Граф (знания, опубликованные связи, категории, виды знаний и связей)
+невелик по сравнению с числом запросов к сайту, поэтому его можно
+загрузить целиком и отвечать на вопросы навигации (категория и цепочка
+знания, связанные и соседние знания) без обращения к базе.
+
+Снимок только для чтения: объекты моделей в нем общие для всех запросов
+процесса и не должны изменяться. Снимок перезагружается, когда меняется
+номер версии KnowledgeGraphVersion (он увеличивается при каждом изменении
+графа, см. drevo/signals.py). Номер версии проверяется не чаще, чем раз
+в KNOWLEDGE_GRAPH_CHECK_INTERVAL секунд.
+
+Снимок используется функциями relations_tree, если включена настройка
+KNOWLEDGE_GRAPH_SNAPSHOT.
+"""
+import collections
+import threading
+import time
+
+from django.conf import settings
+
+from .models import (Category, KnowledgeGraphVersion, Relation, Tr, Tz,
+                     Znanie)
+
+
+class RelationEdge:
+    """
+    Опубликованная связь: базовое знание, связанное знание, вид связи.
+    """
+    __slots__ = ('bz_id', 'rz_id', 'tr_id')
+
+    def __init__(self, bz_id, rz_id, tr_id):
+        self.bz_id = bz_id
+        self.rz_id = rz_id
+        self.tr_id = tr_id
+
+
+class KnowledgeGraph:
+    """
+    Загруженный граф знаний версии version.
+
+    Списки связей by_bz и by_rz упорядочены так же, как Relation
+    (от новых связей к старым), by_category - id опубликованных знаний
+    категории в порядке Znanie.order.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.categories = Category.objects.in_bulk()
+        self.relation_types = Tr.objects.in_bulk()
+        self.knowledge_kinds = Tz.objects.in_bulk()
+        self.knowledges = {}
+        # позиции знаний в порядке Znanie.order
+        self.positions = {}
+        self.by_category = collections.defaultdict(list)
+        for knowledge in Znanie.objects.select_related('author').order_by('order', 'pk'):
+            # виды знаний и категории общие для всех знаний снимка
+            knowledge.tz = self.knowledge_kinds[knowledge.tz_id]
+            knowledge.category = self.categories.get(knowledge.category_id)
+            self.knowledges[knowledge.pk] = knowledge
+            self.positions[knowledge.pk] = len(self.positions)
+            if knowledge.is_published and knowledge.category_id:
+                self.by_category[knowledge.category_id].append(knowledge.pk)
+
+        self.by_bz = collections.defaultdict(list)
+        self.by_rz = collections.defaultdict(list)
+        for bz_id, rz_id, tr_id in (Relation.objects
+                                    .filter(is_published=True)
+                                    .values_list('bz_id', 'rz_id', 'tr_id')):
+            edge = RelationEdge(bz_id, rz_id, tr_id)
+            self.by_bz[bz_id].append(edge)
+            self.by_rz[rz_id].append(edge)
+
+    def get_base_edge(self, knowledge_id):
+        """
+        Связь с базовым знанием: первая опубликованная несистемная связь,
+        ведущая к знанию.
+        """
+        for edge in self.by_rz.get(knowledge_id, ()):
+            if not self.relation_types[edge.tr_id].is_systemic:
+                return edge
+        return None
+
+    def walk(self, knowledge_id):
+        """
+        Возвращает кортеж (категория, список предков) так же,
+        как KnowledgeChain.walk.
+        """
+        ancestors = []
+        visited = {knowledge_id}
+        current = self.knowledges[knowledge_id]
+        while current.is_published:
+            if current.category and current.category.is_published:
+                return current.category, ancestors
+            edge = self.get_base_edge(current.pk)
+            if not edge or edge.bz_id in visited:
+                break
+            current = self.knowledges.get(edge.bz_id)
+            if current is None:
+                break
+            visited.add(current.pk)
+            ancestors.append(current)
+        return None, ancestors
+
+    def get_children_by_relation_type(self, knowledge_id):
+        """
+        См. relations_tree.get_children_by_relation_type_for_knowledge.
+        """
+        if not self.knowledges[knowledge_id].is_published:
+            return {}
+        children = {}
+        for edge in self.by_bz.get(knowledge_id, ()):
+            child = self.knowledges.get(edge.rz_id)
+            if child and child.is_published:
+                children.setdefault(self.relation_types[edge.tr_id], []).append(child)
+        for knowledges in children.values():
+            knowledges.sort(key=lambda x: (x.tz.order, x.order or 0))
+        return dict(sorted(children.items(), key=lambda item: item[0].order or 0))
+
+    def get_sibling_ids(self, knowledge_id):
+        """
+        Возвращает список id знаний группы соседей знания в порядке
+        Znanie.order (см. sibling_index) или None, если соседей нет.
+        """
+        knowledge = self.knowledges[knowledge_id]
+        if not knowledge.is_published:
+            return None
+        if knowledge.category and knowledge.category.is_published:
+            return self.by_category[knowledge.category_id]
+        edge = self.get_base_edge(knowledge_id)
+        if not edge:
+            return None
+        siblings = set()
+        for sibling_edge in self.by_bz.get(edge.bz_id, ()):
+            sibling = self.knowledges.get(sibling_edge.rz_id)
+            if sibling and sibling.is_published and sibling.pk != edge.bz_id:
+                siblings.add(sibling.pk)
+        return sorted(siblings, key=self.positions.__getitem__)
+
+
+_graph = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'KNOWLEDGE_GRAPH_SNAPSHOT', False)
+
+
+def get_graph_for_knowledge(knowledge):
+    """
+    Возвращает снимок графа, если он включен и содержит knowledge,
+    иначе None (знание могло появиться после загрузки снимка).
+    """
+    if not is_enabled():
+        return None
+    graph = get_knowledge_graph()
+    return graph if knowledge.pk in graph.knowledges else None
+
+
+def get_knowledge_graph():
+    """
+    Возвращает актуальный снимок графа, при необходимости перезагружая его.
+    """
+    global _graph, _checked_at
+    graph = _graph
+    interval = getattr(settings, 'KNOWLEDGE_GRAPH_CHECK_INTERVAL', 1)
+    if graph is not None and time.monotonic() - _checked_at < interval:
+        return graph
+    with _lock:
+        version = KnowledgeGraphVersion.get_version()
+        _checked_at = time.monotonic()
+        if _graph is None or _graph.version != version:
+            _graph = KnowledgeGraph(version)
+        return _graph
+
+
+def invalidate_knowledge_graph():
+    """
+    Увеличивает номер версии графа. Снимок текущего процесса сбрасывается
+    сразу, остальные процессы перезагрузят его при следующей проверке версии.
+    """
+    global _graph
+    if is_enabled():
+        KnowledgeGraphVersion.bump()
+    _graph = None
@@ -0,0 +1,44 @@
+"""
+Регистронезависимый поиск по строковым полям.
+
+Для CharField и TextField регистрируется преобразование __lower
+(например, name__lower__contains='знание'), которое в SQL превращается
+в LOWER(поле). Встроенная функция LOWER в SQLite меняет регистр только
+латинских букв, поэтому для SQLite преобразование использует отдельную
+функцию UNICODE_LOWER (str.lower), регистрируемую для каждого соединения.
+Встроенная LOWER не заменяется: ее используют другие клиенты базы.
+
+Индексы для __lower строятся по тому же выражению UnicodeLower('name'),
+иначе SQLite не сможет их использовать. Функция детерминирована, но
+изменять проиндексированные таблицы SQLite можно только из соединений,
+где она зарегистрирована.
+"""
+from django.db.backends.signals import connection_created
+from django.db.models import CharField, TextField
+from django.db.models.functions import Lower
+from django.dispatch import receiver
+
+
+class UnicodeLower(Lower):
+    """
+    LOWER, в SQLite - UNICODE_LOWER.
+    """
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='UNICODE_LOWER', **extra_context)
+
+
+CharField.register_lookup(UnicodeLower)
+TextField.register_lookup(UnicodeLower)
+
+
+def lower(value):
+    if value is None:
+        return None
+    return value.lower()
+
+
+@receiver(connection_created)
+def register_sqlite_lower(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('UNICODE_LOWER', 1, lower, deterministic=True)
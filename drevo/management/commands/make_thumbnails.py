@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from drevo.models import ZnImage
+from drevo.thumbnails import AVATAR, PHOTO, make_thumbnails
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = ('Создает уменьшенные копии фото знаний и аватаров пользователей, '
+            'загруженных ранее')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force',
+                            action='store_true',
+                            help='Создать заново уже существующие копии')
+
+    def handle(self, *args, **options):
+        images = [(image.photo, PHOTO)
+                  for image in ZnImage.objects.exclude(photo='')]
+        images += [(profile.avatar, AVATAR)
+                   for profile in Profile.objects.exclude(avatar='').exclude(avatar=None)]
+        count = 0
+        for field_file, kind in images:
+            try:
+                count += make_thumbnails(field_file, kind, force=options['force'])
+            except Exception as e:
+                self.stderr.write(f'{field_file.name}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Обработано копий изображений: {count}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from drevo.models import Comment
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает положение комментариев в ветках и счетчики ответов '
+            '(Comment.root, depth, path, answers_count)')
+
+    def handle(self, *args, **options):
+        count = Comment.rebuild_threads()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано комментариев: {count}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from drevo.models import KnowledgeChain, Znanie
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные цепочки знаний (KnowledgeChain)'
+
+    def handle(self, *args, **options):
+        KnowledgeChain.invalidate_all()
+        knowledges = Znanie.objects.select_related('category')
+        count = 0
+        for knowledge in knowledges.iterator():
+            KnowledgeChain.build(knowledge)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Построено цепочек: {count}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from drevo.models import Znanie
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики лайков, дизлайков и комментариев знаний '
+            '(Znanie.likes_count, dislikes_count, comments_count)')
+
+    def handle(self, *args, **options):
+        count = Znanie.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано знаний: {count}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from drevo.models import Znanie
+from drevo.search_index import index_knowledge
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс знаний (KnowledgeSearchTerm)'
+
+    def handle(self, *args, **options):
+        count = 0
+        for knowledge in Znanie.objects.only(
+                'pk', 'name', 'content', 'source_com').iterator():
+            index_knowledge(knowledge)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано знаний: {count}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from drevo.visit_tracking import rebuild_visits_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики просмотров знаний (Znanie.visits_count) по Visits и IP'
+
+    def handle(self, *args, **options):
+        count = rebuild_visits_counts()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано знаний: {count}'))
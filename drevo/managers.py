@@ -1,7 +1,30 @@
 from django.db import models
 
 
-class ZManager(models.Manager):
+class ZnanieQuerySet(models.QuerySet):
+    """
+    QuerySet записей для сущности Znanie.
+    """
+    def with_stats(self, user=None):
+        """
+        Добавляет к знаниям оценку (лайк или дизлайк) пользователя user
+        в аннотации user_vote. Число лайков, дизлайков, комментариев
+        и просмотров хранится в полях знания, поэтому вся статистика
+        выбирается тем же запросом, что и сами знания.
+        """
+        from .models.knowledge_rating import ZnRating
+
+        if user is None or not user.is_authenticated:
+            return self.annotate(user_vote=models.Value(None, output_field=models.CharField()))
+        votes = (ZnRating.objects
+                 .filter(znanie=models.OuterRef('pk'),
+                         user=user,
+                         value__in=(ZnRating.LIKE, ZnRating.DISLIKE))
+                 .values('value')[:1])
+        return self.annotate(user_vote=models.Subquery(votes))
+
+
+class ZManager(models.Manager.from_queryset(ZnanieQuerySet)):
     """
     Manager записей для сущности Znanie.
     Установлены фильтр и сортировка.
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.4 on 2026-10-18 06:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0012_auto_20220426_1733'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='category',
+            managers=[
+            ],
+        ),
+        migrations.CreateModel(
+            name='KnowledgeChain',
+            fields=[
+                ('knowledge', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='chain', serialize=False, to='drevo.znanie', verbose_name='Знание')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='drevo.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Цепочка знания',
+                'verbose_name_plural': 'Цепочки знаний',
+            },
+        ),
+        migrations.CreateModel(
+            name='KnowledgeChainLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(verbose_name='Удаленность')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chain_links', to='drevo.znanie', verbose_name='Предок')),
+                ('chain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='links', to='drevo.knowledgechain', verbose_name='Цепочка')),
+            ],
+            options={
+                'verbose_name': 'Звено цепочки знания',
+                'verbose_name_plural': 'Звенья цепочек знаний',
+                'unique_together': {('chain', 'depth')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.4 on 2026-10-18 06:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0013_knowledgechain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgeSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('knowledge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='drevo.znanie', verbose_name='Знание')),
+            ],
+            options={
+                'verbose_name': 'Терм поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс знаний',
+                'unique_together': {('term', 'knowledge')},
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+import re
+from html import unescape
+
+import snowballstemmer
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Нормализация слов на момент миграции (см. drevo/search_index.py).
+# Последующие изменения нормализации применяются командой rebuild_search_index.
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+TERM_MAX_LENGTH = 64
+INDEXED_FIELDS = ('name', 'content', 'source_com')
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'был', 'была', 'были', 'было', 'быть', 'в', 'вам', 'вас',
+    'во', 'вот', 'все', 'всех', 'вы', 'где', 'да', 'для', 'до', 'его', 'ее',
+    'если', 'есть', 'еще', 'же', 'за', 'и', 'из', 'или', 'им', 'их', 'к',
+    'как', 'когда', 'кто', 'ли', 'мне', 'мы', 'на', 'над', 'нас', 'не', 'него',
+    'нее', 'нет', 'ни', 'но', 'о', 'об', 'он', 'она', 'они', 'от', 'по', 'под',
+    'при', 'про', 'с', 'со', 'так', 'там', 'то', 'тот', 'ты', 'у', 'уже',
+    'чем', 'что', 'чтобы', 'это', 'этот', 'я',
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'with',
+))
+
+
+def get_terms(text, stemmers):
+    if not text:
+        return set()
+    terms = set()
+    for word in WORD_RE.findall(unescape(strip_tags(text))):
+        word = word.casefold().replace('ё', 'е')
+        if word in STOP_WORDS:
+            continue
+        stemmer = stemmers['russian' if CYRILLIC_RE.search(word) else 'english']
+        terms.add(stemmer.stemWord(word)[:TERM_MAX_LENGTH])
+    return terms
+
+
+def rebuild_search_index(apps, schema_editor):
+    Znanie = apps.get_model('drevo', 'Znanie')
+    KnowledgeSearchTerm = apps.get_model('drevo', 'KnowledgeSearchTerm')
+    stemmers = {language: snowballstemmer.stemmer(language)
+                for language in ('russian', 'english')}
+    KnowledgeSearchTerm.objects.all().delete()
+    for knowledge in Znanie.objects.iterator():
+        terms = set()
+        for field_name in INDEXED_FIELDS:
+            terms |= get_terms(getattr(knowledge, field_name), stemmers)
+        KnowledgeSearchTerm.objects.bulk_create(
+            [KnowledgeSearchTerm(knowledge_id=knowledge.pk, term=term)
+             for term in terms]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0014_knowledgesearchterm'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.4 on 2026-10-18 06:26
+
+from django.db import migrations, models
+import drevo.lookups
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0015_rebuild_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(drevo.lookups.UnicodeLower('name'), name='drevo_author_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(drevo.lookups.UnicodeLower('name'), name='drevo_category_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(drevo.lookups.UnicodeLower('name'), name='drevo_label_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='tr',
+            index=models.Index(drevo.lookups.UnicodeLower('name'), name='drevo_tr_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='tz',
+            index=models.Index(drevo.lookups.UnicodeLower('name'), name='drevo_tz_name_lower'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.4 on 2026-10-18 06:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def rebuild_visits_counts(apps, schema_editor):
+    Znanie = apps.get_model('drevo', 'Znanie')
+    Visits = apps.get_model('drevo', 'Visits')
+    IP = apps.get_model('drevo', 'IP')
+
+    def count_visits(model):
+        return Coalesce(Subquery(model.objects
+                                 .filter(znanie=OuterRef('pk'))
+                                 .order_by()
+                                 .values('znanie')
+                                 .annotate(count=Count('pk'))
+                                 .values('count')),
+                        0)
+
+    Znanie.objects.update(
+        visits_count=count_visits(Visits) + count_visits(IP.visits.through))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0016_name_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='znanie',
+            name='visits_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число просмотров'),
+        ),
+        migrations.RunPython(rebuild_visits_counts, migrations.RunPython.noop),
+    ]
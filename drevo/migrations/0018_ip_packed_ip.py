@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0017_znanie_visits_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ip',
+            name='packed_ip',
+            field=models.BinaryField(max_length=16, null=True),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import ipaddress
+
+from django.db import migrations
+from django.db.models import Min
+
+
+def pack(address):
+    """
+    Двоичное представление адреса на момент миграции (см. IP.pack).
+    """
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except (AttributeError, ValueError):
+        return None
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.packed
+
+
+def pack_addresses(apps, schema_editor):
+    """
+    Переводит адреса в двоичный вид. Некорректные адреса удаляются,
+    просмотры повторяющихся адресов переносятся на первую запись адреса.
+    """
+    IP = apps.get_model('drevo', 'IP')
+    IPVisit = IP.visits.through
+    kept = {}
+    for ip in IP.objects.order_by('pk').iterator():
+        packed = pack(ip.ip)
+        if packed is None:
+            ip.delete()
+        elif packed in kept:
+            IPVisit.objects.bulk_create(
+                [IPVisit(ip_id=kept[packed], znanie_id=znanie_id)
+                 for znanie_id in (IPVisit.objects
+                                   .filter(ip_id=ip.pk)
+                                   .values_list('znanie_id', flat=True))],
+                ignore_conflicts=True
+            )
+            ip.delete()
+        else:
+            ip.packed_ip = packed
+            ip.save(update_fields=['packed_ip'])
+            kept[packed] = ip.pk
+
+
+def remove_duplicate_visits(apps, schema_editor):
+    Visits = apps.get_model('drevo', 'Visits')
+    kept_ids = (Visits.objects
+                .values('user', 'znanie')
+                .annotate(min_id=Min('pk'))
+                .values_list('min_id', flat=True))
+    Visits.objects.exclude(pk__in=list(kept_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0018_ip_packed_ip'),
+    ]
+
+    # изменение данных выполняется отдельно от изменения схемы таблиц
+    # (см. 0020_compact_ip_visits): PostgreSQL не изменяет таблицу,
+    # пока в транзакции есть отложенные проверки внешних ключей
+    operations = [
+        migrations.RunPython(pack_addresses, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicate_visits, migrations.RunPython.noop),
+    ]
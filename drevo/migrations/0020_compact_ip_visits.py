@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def rebuild_visits_counts(apps, schema_editor):
+    Znanie = apps.get_model('drevo', 'Znanie')
+    Visits = apps.get_model('drevo', 'Visits')
+    IP = apps.get_model('drevo', 'IP')
+
+    def count_visits(model):
+        return Coalesce(Subquery(model.objects
+                                 .filter(znanie=OuterRef('pk'))
+                                 .order_by()
+                                 .values('znanie')
+                                 .annotate(count=Count('pk'))
+                                 .values('count')),
+                        0)
+
+    Znanie.objects.update(
+        visits_count=count_visits(Visits) + count_visits(IP.visits.through))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0019_pack_ip_addresses'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ip',
+            name='ip',
+        ),
+        migrations.RenameField(
+            model_name='ip',
+            old_name='packed_ip',
+            new_name='ip',
+        ),
+        migrations.AlterField(
+            model_name='ip',
+            name='ip',
+            field=models.BinaryField(max_length=16, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='visits',
+            constraint=models.UniqueConstraint(fields=('user', 'znanie'), name='drevo_visits_unique_user_znanie'),
+        ),
+        migrations.RunPython(rebuild_visits_counts, migrations.RunPython.noop),
+    ]
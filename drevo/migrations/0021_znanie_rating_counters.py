@@ -0,0 +1,49 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def rebuild_counters(apps, schema_editor):
+    Znanie = apps.get_model('drevo', 'Znanie')
+    ZnRating = apps.get_model('drevo', 'ZnRating')
+    Comment = apps.get_model('drevo', 'Comment')
+
+    def count(model, **filters):
+        return Coalesce(Subquery(model.objects
+                                 .filter(znanie=OuterRef('pk'), **filters)
+                                 .order_by()
+                                 .values('znanie')
+                                 .annotate(count=Count('pk'))
+                                 .values('count')),
+                        0)
+
+    Znanie.objects.update(
+        likes_count=count(ZnRating, value='like'),
+        dislikes_count=count(ZnRating, value='dislike'),
+        comments_count=count(Comment, parent=None))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0020_compact_ip_visits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='znanie',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.AddField(
+            model_name='znanie',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число дизлайков'),
+        ),
+        migrations.AddField(
+            model_name='znanie',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число лайков'),
+        ),
+        migrations.RunPython(rebuild_counters, migrations.RunPython.noop),
+    ]
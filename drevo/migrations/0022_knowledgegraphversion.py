@@ -0,0 +1,24 @@
+# Generated by Django 3.2.4 on 2026-10-18 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0021_znanie_rating_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgeGraphVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия графа знаний',
+                'verbose_name_plural': 'Версия графа знаний',
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+import collections
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+PATH_STEP = 10
+
+
+def fill_threads(apps, schema_editor):
+    Comment = apps.get_model('drevo', 'Comment')
+    comments = {}
+    answers_counts = collections.Counter()
+    for comment in Comment.objects.order_by('pk').only('pk', 'parent_id'):
+        parent = comments.get(comment.parent_id)
+        segment = str(comment.pk).zfill(PATH_STEP)
+        if parent:
+            comment.root_id = parent.root_id
+            comment.depth = parent.depth + 1
+            comment.path = parent.path + segment
+            answers_counts[parent.pk] += 1
+        else:
+            comment.root_id = comment.pk
+            comment.depth = 0
+            comment.path = segment
+        comments[comment.pk] = comment
+    for comment in comments.values():
+        comment.answers_count = answers_counts[comment.pk]
+    Comment.objects.bulk_update(comments.values(),
+                                ['root', 'depth', 'path', 'answers_count'],
+                                batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drevo', '0022_knowledgegraphversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='answers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество ответов'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина в ветке'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=510, verbose_name='Путь в ветке'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='root',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='drevo.comment', verbose_name='Корневой комментарий'),
+        ),
+        migrations.RunPython(fill_threads, migrations.RunPython.noop),
+    ]
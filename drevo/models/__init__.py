@@ -8,6 +8,9 @@ from .knowledge_image import ZnImage
 from .knowledge_kind import Tz
 from .knowledge_rating import ZnRating
 from .knowledge import Znanie
+from .knowledge_chain import KnowledgeChain, KnowledgeChainLink
+from .knowledge_graph_version import KnowledgeGraphVersion
+from .knowledge_search_term import KnowledgeSearchTerm
 from .label import Label
 from .relation_type import Tr
 from .relation import Relation
@@ -24,6 +27,10 @@ __all__ = [
     'Tz',
     'ZnRating',
     'Znanie',
+    'KnowledgeChain',
+    'KnowledgeChainLink',
+    'KnowledgeGraphVersion',
+    'KnowledgeSearchTerm',
     'Label',
     'Tr',
     'Relation',
@@ -1,4 +1,5 @@
 from django.db import models
+from ..lookups import UnicodeLower
 
 
 class Author(models.Model):
@@ -35,3 +36,5 @@ class Author(models.Model):
     class Meta:
         verbose_name = 'Автор'
         verbose_name_plural = 'Авторы'
+        # индекс по выражению сравнения name__lower=... (см. drevo/lookups.py)
+        indexes = [models.Index(UnicodeLower('name'), name='drevo_author_name_lower')]
@@ -1,4 +1,5 @@
 from django.db import models
+from ..lookups import UnicodeLower
 from mptt.models import MPTTModel, TreeForeignKey, TreeManager
 from django.urls import reverse
 from ..managers import CategoryManager
@@ -52,6 +53,8 @@ class Category(MPTTModel):
     class Meta:
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
+        # индекс по выражению сравнения name__lower=... (см. drevo/lookups.py)
+        indexes = [models.Index(UnicodeLower('name'), name='drevo_category_name_lower')]
 
     class MPTTMeta:
         order_insertion_by = ['name']
@@ -1,10 +1,24 @@
-from django.db import models
+import collections
+
+from django.db import models, transaction
+from django.db.models import F
 from users.models import User
 
 
 class Comment(models.Model):
+    """
+    Комментарий знания или ответ на комментарий.
+
+    Положение комментария в ветке хранится вместе с ним: root - корневой
+    комментарий ветки, depth - глубина (0 у корневого), path - путь из
+    id комментариев от корня, дополненных нулями до PATH_STEP знаков,
+    поэтому ветка или ее часть читается одним запросом по индексу.
+    answers_count - число непосредственных ответов.
+    """
     CONTENT_MAX_LENGTH = 2000
     COMMENTS_PER_PAGE = 3
+    PATH_STEP = 10
+    MAX_DEPTH = 50
 
     author = models.ForeignKey(User,
                                on_delete=models.PROTECT,
@@ -27,6 +41,27 @@ class Comment(models.Model):
                                blank=True,
                                verbose_name='Тело комментария',
                                )
+    root = models.ForeignKey('self',
+                             null=True,
+                             editable=False,
+                             on_delete=models.CASCADE,
+                             related_name='+',
+                             verbose_name='Корневой комментарий',
+                             )
+    path = models.CharField(max_length=PATH_STEP * (MAX_DEPTH + 1),
+                            default='',
+                            editable=False,
+                            db_index=True,
+                            verbose_name='Путь в ветке',
+                            )
+    depth = models.PositiveSmallIntegerField(default=0,
+                                             editable=False,
+                                             verbose_name='Глубина в ветке',
+                                             )
+    answers_count = models.PositiveIntegerField(default=0,
+                                                editable=False,
+                                                verbose_name='Количество ответов',
+                                                )
     is_published = models.BooleanField(default=True,
                                        verbose_name='Опубликован'
                                        )
@@ -46,6 +81,83 @@ class Comment(models.Model):
     def __str__(self):
         return f'{self.id} - {self.author} - {self.znanie} ({self.created_at:%d.%m.%Y %H:%M})'
 
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                self._set_thread_position()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        Обновляет запись комментария. Счетчик ответов записывается, только
+        если он явно указан в update_fields: его изменяют ответы
+        (см. _set_thread_position и drevo/signals.py).
+        """
+        if update_fields is None:
+            values = [value for value in values if value[0].name != 'answers_count']
+        return super()._do_update(base_qs, using, pk_val, values, update_fields,
+                                  forced_update)
+
+    def _set_thread_position(self):
+        """
+        Заполняет root, depth и path нового комментария (путь включает
+        id, поэтому известен только после вставки) и увеличивает
+        счетчик ответов родительского комментария.
+        """
+        parent = self.parent
+        segment = str(self.pk).zfill(self.PATH_STEP)
+        if parent:
+            self.root_id = parent.root_id
+            self.depth = parent.depth + 1
+            self.path = parent.path + segment
+            (Comment.objects
+             .filter(pk=parent.pk)
+             .update(answers_count=F('answers_count') + 1))
+        else:
+            self.root_id = self.pk
+            self.depth = 0
+            self.path = segment
+        (Comment.objects
+         .filter(pk=self.pk)
+         .update(root_id=self.root_id, depth=self.depth, path=self.path))
+
+    @classmethod
+    def rebuild_threads(cls):
+        """
+        Пересчитывает root, depth, path и answers_count всех комментариев.
+        """
+        comments = {}
+        answers_counts = collections.Counter()
+        # родительский комментарий создается раньше ответов на него
+        for comment in cls.objects.order_by('pk').only('pk', 'parent_id'):
+            parent = comments.get(comment.parent_id)
+            segment = str(comment.pk).zfill(cls.PATH_STEP)
+            if parent:
+                comment.root_id = parent.root_id
+                comment.depth = parent.depth + 1
+                comment.path = parent.path + segment
+                answers_counts[parent.pk] += 1
+            else:
+                comment.root_id = comment.pk
+                comment.depth = 0
+                comment.path = segment
+            comments[comment.pk] = comment
+        for comment in comments.values():
+            comment.answers_count = answers_counts[comment.pk]
+        cls.objects.bulk_update(comments.values(),
+                                ['root', 'depth', 'path', 'answers_count'],
+                                batch_size=500)
+        return len(comments)
+
+    def get_thread(self):
+        """
+        Возвращает queryset комментария и всех ответов на него
+        на любой глубине.
+        """
+        return Comment.objects.filter(root_id=self.root_id,
+                                      path__startswith=self.path)
+
     def publish(self):
         self.is_published = True
 
@@ -53,6 +165,12 @@ class Comment(models.Model):
         self.is_published = False
 
     def get_answers(self):
+        """
+        Возвращает ответы на комментарий. Ответы, загруженные вместе
+        с веткой (см. comment_threads), возвращаются без запроса к базе.
+        """
+        if hasattr(self, 'thread_answers'):
+            return self.thread_answers
         return self.answers.all()
 
     @property
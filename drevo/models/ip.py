@@ -1,3 +1,5 @@
+import ipaddress
+
 from django.db import models
 
 
@@ -10,5 +12,29 @@ class IP(models.Model):
                                     verbose_name='ID',
                                     blank=True
                                     )
-    ip = models.CharField(max_length=100)
+    # Адрес в двоичном виде: 4 байта для IPv4, 16 байт для IPv6
+    ip = models.BinaryField(max_length=16,
+                            unique=True
+                            )
     objects = models.Manager()
+
+    def __str__(self):
+        return self.address
+
+    @property
+    def address(self):
+        return str(ipaddress.ip_address(bytes(self.ip)))
+
+    @staticmethod
+    def pack(address):
+        """
+        Возвращает двоичное представление адреса address или None, если
+        адрес некорректен. IPv6-адреса вида ::ffff:a.b.c.d хранятся как IPv4.
+        """
+        try:
+            ip = ipaddress.ip_address(address.strip())
+        except (AttributeError, ValueError):
+            return None
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        return ip.packed
@@ -1,11 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from mptt.models import TreeForeignKey
 from django.urls import reverse
 from users.models import User
-from ..managers import ZManager
+from ..managers import ZManager, ZnanieQuerySet
 from .category import Category
+from .comment import Comment
 from .knowledge_rating import ZnRating
 from .relation_type import Tr
+from .relation import Relation
 from .knowledge_grade_scale import KnowledgeGradeScale
 
 
@@ -75,29 +79,68 @@ class Znanie(models.Model):
                                     verbose_name='Метки',
                                     blank=True
                                     )
+    # Число просмотров (пользователей и ip-адресов), поддерживается
+    # при записи просмотров (см. drevo/visit_tracking.py)
+    visits_count = models.PositiveIntegerField(default=0,
+                                               editable=False,
+                                               verbose_name='Число просмотров'
+                                               )
+    # Счетчики оценок и комментариев первого уровня,
+    # поддерживаются обработчиками сигналов ZnRating и Comment
+    # (см. drevo/signals.py)
+    likes_count = models.PositiveIntegerField(default=0,
+                                              editable=False,
+                                              verbose_name='Число лайков'
+                                              )
+    dislikes_count = models.PositiveIntegerField(default=0,
+                                                 editable=False,
+                                                 verbose_name='Число дизлайков'
+                                                 )
+    comments_count = models.PositiveIntegerField(default=0,
+                                                 editable=False,
+                                                 verbose_name='Число комментариев'
+                                                 )
     # Для обработки записей (сортировка, фильтрация) вызывается собственный Manager,
     # в котором уже установлена фильтрация по is_published и сортировка
-    objects = models.Manager()
+    objects = ZnanieQuerySet.as_manager()
     published = ZManager()
 
+    # Счетчики изменяются только запросами UPDATE с F()-выражениями
+    COUNTER_FIELDS = ('visits_count', 'likes_count', 'dislikes_count', 'comments_count')
+
     def __str__(self):
         return self.name
 
     def get_absolute_url(self):
         return reverse('zdetail', kwargs={"pk": self.pk})
 
-    def voting(self, user, value):
-        rating_obj = self.znrating_set.filter(user=user).first()
-
-        if rating_obj:
-            if value == rating_obj.value:
-                rating_obj.value = ZnRating.BLANK
-            else:
-                rating_obj.value = value
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        Обновляет запись знания. Счетчики записываются, только если они
+        явно указаны в update_fields: иначе сохранение устаревшего
+        экземпляра перезаписало бы одновременные изменения счетчиков.
+        При вставке записи (в том числе копии) счетчики записываются.
+        """
+        if update_fields is None:
+            values = [value for value in values
+                      if value[0].name not in self.COUNTER_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields,
+                                  forced_update)
 
+    def voting(self, user, value):
+        """
+        Ставит или снимает (при повторном голосе) оценку пользователя.
+        Счетчики лайков и дизлайков изменяются обработчиками сигналов
+        ZnRating (см. drevo/signals.py) в той же транзакции.
+        """
+        with transaction.atomic():
+            rating_obj, _ = (ZnRating.objects
+                             .select_for_update()
+                             .get_or_create(znanie=self, user=user,
+                                            defaults={'value': ZnRating.BLANK}))
+            old_value = rating_obj.value
+            rating_obj.value = ZnRating.BLANK if value == old_value else value
             rating_obj.save()
-        else:
-            ZnRating.objects.create(znanie=self, user=user, value=value)
 
     def get_users_vote(self, user):
         rating_obj = self.znrating_set.filter(user=user).first()
@@ -109,15 +152,49 @@ class Znanie(models.Model):
         return None
 
     def get_likes_count(self):
-        return self.znrating_set.filter(value=ZnRating.LIKE).count()
+        return self.likes_count
 
     def get_dislikes_count(self):
-        return self.znrating_set.filter(value=ZnRating.DISLIKE).count()
+        return self.dislikes_count
 
     def get_comments_count(self):
-        return self.comments.filter(parent=None).count()
+        return self.comments_count
+
+    @staticmethod
+    def update_counters(knowledge_id, **deltas):
+        """
+        Атомарно изменяет счетчики знания на величины deltas
+        (например, likes_count=1, dislikes_count=-1).
+        """
+        counters = {name: F(name) + delta for name, delta in deltas.items() if delta}
+        if counters:
+            Znanie.objects.filter(pk=knowledge_id).update(**counters)
+
+    @classmethod
+    def rebuild_counters(cls):
+        """
+        Пересчитывает счетчики лайков, дизлайков и комментариев всех знаний.
+        """
+        def count(model, **filters):
+            return Coalesce(Subquery(model.objects
+                                     .filter(znanie=OuterRef('pk'), **filters)
+                                     .order_by()
+                                     .values('znanie')
+                                     .annotate(count=Count('pk'))
+                                     .values('count')),
+                            0)
+
+        return cls.objects.update(
+            likes_count=count(ZnRating, value=ZnRating.LIKE),
+            dislikes_count=count(ZnRating, value=ZnRating.DISLIKE),
+            comments_count=count(Comment, parent=None))
 
     def get_table_object(self):
+        """
+        Строит объект таблицы для знания вида 'Таблица'.
+        Значение попадает в ячейку, если у знания-значения ровно две связи,
+        ведущие к знаниям строки и столбца этой ячейки.
+        """
         if self.tz.name != 'Таблица':
             return None
 
@@ -125,21 +202,35 @@ class Znanie(models.Model):
         col_type_name = 'Столбец'
         value_type_name = 'Значение'
 
-        row_type = Tr.objects.get(name=row_type_name)
-        col_type = Tr.objects.get(name=col_type_name)
-        value_type = Tr.objects.get(name=value_type_name)
-
-        rows = sorted(
-            self.base.filter(tr=row_type).select_related('bz', 'rz'),
-            key=lambda x: x.rz.order if x.rz.order else 0,
-            reverse=True
-        )
-        cols = sorted(
-            self.base.filter(tr=col_type).select_related('bz', 'rz'),
-            key=lambda x: x.rz.order if x.rz.order else 0,
-            reverse=True
-        )
-        values = self.base.filter(tr=value_type).select_related('rz')
+        relation_types = {
+            tr.name: tr for tr in Tr.objects.filter(
+                name__in=(row_type_name, col_type_name, value_type_name))
+        }
+        if len(relation_types) < 3:
+            return None
+        row_type = relation_types[row_type_name]
+        col_type = relation_types[col_type_name]
+        value_type = relation_types[value_type_name]
+
+        headers = list(self.base
+                       .filter(tr__in=(row_type, col_type))
+                       .select_related('bz', 'rz__tz'))
+
+        def sort_by_order(x):
+            return x.rz.order if x.rz.order else 0
+
+        rows = sorted((x for x in headers if x.tr_id == row_type.pk),
+                      key=sort_by_order, reverse=True)
+        cols = sorted((x for x in headers if x.tr_id == col_type.pk),
+                      key=sort_by_order, reverse=True)
+        values = list(self.base
+                      .filter(tr=value_type)
+                      .select_related('rz')
+                      .prefetch_related(models.Prefetch('rz__base',
+                                                        queryset=Relation.objects.only('bz', 'rz'))))
+
+        if not all([rows, cols, values]):
+            return None
 
         target_rows = rows
         target_cols = cols
@@ -149,30 +240,25 @@ class Znanie(models.Model):
         if cols[0].rz.tz.is_group:
             target_cols = cols[0].get_grouped_relations()
 
-        if not all([rows, cols, values]):
-            return None
+        # индекс {пара (знание строки, знание столбца): значение}
+        # заполняется за один проход по значениям
+        values_index = {}
+        for value in values:
+            value_base = value.rz.base.all()
+            if len(value_base) == 2:
+                key = frozenset(x.rz_id for x in value_base)
+                values_index.setdefault(key, value.rz)
 
-        matrix = list()
-
-        for i, row in enumerate(target_rows):
-            matrix.append([])
-            for j, col in enumerate(target_cols):
-                matrix[i].append(None)
-                values_list = list(
-                    filter(
-                        lambda x: len(x.rz.base.all()) == 2 and all(
-                            map(lambda y: y.rz == row.rz or y.rz ==
-                                col.rz, x.rz.base.all())
-                        ),
-                        values
-                    )
-                )
-                if values_list:
-                    matrix[i][j] = values_list[0].rz
+        matrix = [
+            [values_index.get(frozenset((row.rz_id, col.rz_id))) for col in target_cols]
+            for row in target_rows
+        ]
 
         table_object = {
             'rows': rows,
             'cols': cols,
+            'target_rows': target_rows,
+            'target_cols': target_cols,
             'values': matrix,
         }
         return table_object
@@ -183,54 +269,25 @@ class Znanie(models.Model):
             return queryset.first().grade.get_base_grade()
         return KnowledgeGradeScale.objects.first().get_base_grade()
 
-    def get_common_grades(self, request):
+    @staticmethod
+    def get_grade_variant(request):
         variant = request.GET.get('variant')
         if variant and variant.isdigit():
-            variant = int(variant)
-        else:
-            variant = 2
-
-        proof_base_value = self.get_proof_base_grade(request, variant)
-        if not proof_base_value:
-            proof_base_value = KnowledgeGradeScale.objects.all().first().get_base_grade()
-        common_grade_value = (
-            proof_base_value + self.get_users_grade(request.user)) / 2
-        return common_grade_value, proof_base_value
-
-    def get_proof_base_grade(self, request, variant=2, sum_list=None, base_flag=True):
-        if sum_list is None:
-            sum_list = []
-
-        queryset = self.base.filter(
-            tr__is_argument=True,
-            rz__tz__can_be_rated=True,
-        )
-        summ = 0
-        if queryset.exists():
-            if variant == 1:
-                sum_list.append(sum(map(lambda x: x.rz.get_users_grade(
-                    request.user), queryset)) / len(queryset))
-            else:
-                sum_list.append(
-                    sum(map(lambda x: x.get_proof_weight(request.user), queryset)) / len(queryset))
-
-            for relation in queryset:
-                child = relation.rz
-                child_list = child.get_proof_base_grade(
-                    request, sum_list=sum_list, base_flag=False)
-                cl = list(filter(lambda x: x > 0, child_list))
-                if cl:
-                    summ += sum(cl) / len(cl)
-            if summ:
-                sum_list.append(summ)
-
-        if base_flag:
-            sum_list = list(filter(lambda x: x > 0, sum_list))
-            if sum_list:
-                return sum(sum_list) / len(sum_list)
-            else:
-                return 0
-        return [summ]
+            return int(variant)
+        return 2
+
+    def get_common_grades(self, request):
+        from ..proof_grades import get_cached_common_grades
+
+        grades = get_cached_common_grades(self, request.user,
+                                          variant=self.get_grade_variant(request))
+        return grades[self.pk]
+
+    def get_proof_base_grade(self, request, variant=2):
+        from ..proof_grades import ProofGradeSnapshot
+
+        snapshot = ProofGradeSnapshot(self, request.user)
+        return snapshot.get_proof_base_grade(variant=variant)
 
     class Meta:
         verbose_name = 'Знание'
@@ -0,0 +1,162 @@
+from django.db import models, transaction
+from .relation import Relation
+
+
+class KnowledgeChain(models.Model):
+    """
+    Материализованная цепочка знания: категория, к которой в итоге
+    относится знание, и список знаний, через которые оно связано с
+    основным знанием (см. KnowledgeChainLink).
+
+    Запись строится один раз при первом обращении и удаляется
+    (см. drevo/signals.py) при изменении связей, категорий или
+    публикации знаний, входящих в цепочку.
+    """
+    knowledge = models.OneToOneField('Znanie',
+                                     on_delete=models.CASCADE,
+                                     primary_key=True,
+                                     related_name='chain',
+                                     verbose_name='Знание'
+                                     )
+    category = models.ForeignKey('Category',
+                                 on_delete=models.CASCADE,
+                                 null=True,
+                                 blank=True,
+                                 related_name='+',
+                                 verbose_name='Категория'
+                                 )
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Цепочка знания'
+        verbose_name_plural = 'Цепочки знаний'
+
+    def __str__(self):
+        return f'Цепочка для "{self.knowledge_id}"'
+
+    @staticmethod
+    def walk(knowledge):
+        """
+        Проходит по цепочке связей от знания к основному знанию.
+        Возвращает кортеж (категория, список предков), предки идут от
+        ближайшего к основному знанию. Категория равна None, если цепочка
+        обрывается на неопубликованном знании или не доходит до категории.
+        """
+        return KnowledgeChain.walk_many([knowledge])[knowledge.pk]
+
+    @staticmethod
+    def walk_many(knowledges):
+        """
+        Проходит по цепочкам связей сразу для нескольких знаний, поднимаясь
+        на один уровень за запрос (по одному запросу на уровень самой
+        длинной цепочки). Возвращает словарь {id знания: (категория,
+        список предков)} в том же виде, что и walk.
+        """
+        results = {}
+        # {id знания: (текущее знание цепочки, предки, пройденные id знаний)}
+        walks = {knowledge.pk: (knowledge, [], {knowledge.pk})
+                 for knowledge in knowledges}
+        while walks:
+            pending = {}
+            for pk, (current, ancestors, visited) in walks.items():
+                if not current.is_published:
+                    results[pk] = None, ancestors
+                elif current.category and current.category.is_published:
+                    results[pk] = current.category, ancestors
+                else:
+                    pending[pk] = current, ancestors, visited
+            if not pending:
+                break
+
+            # первая по порядку модели связь для каждого знания (как в first())
+            relations = {}
+            for relation in (Relation.objects
+                             .filter(rz_id__in={current.pk for current, _, _ in pending.values()},
+                                     is_published=True)
+                             .exclude(tr__is_systemic=True)
+                             .select_related('bz__category')):
+                relations.setdefault(relation.rz_id, relation)
+
+            walks = {}
+            for pk, (current, ancestors, visited) in pending.items():
+                relation = relations.get(current.pk)
+                if not relation or relation.bz_id in visited:
+                    results[pk] = None, ancestors
+                else:
+                    walks[pk] = (relation.bz,
+                                 ancestors + [relation.bz],
+                                 visited | {relation.bz_id})
+        return results
+
+    @classmethod
+    def build(cls, knowledge):
+        """
+        Строит и сохраняет цепочку для знания.
+        Возвращает кортеж (категория, список предков) в том же виде, что и walk.
+        """
+        return cls.build_many([knowledge])[knowledge.pk]
+
+    @classmethod
+    def build_many(cls, knowledges):
+        """
+        Строит и сохраняет цепочки для нескольких знаний.
+        Возвращает словарь {id знания: (категория, список предков)}.
+        """
+        results = cls.walk_many(knowledges)
+        chains = [cls(knowledge_id=pk, category=category)
+                  for pk, (category, _) in results.items()]
+        links = []
+        for pk, (_, ancestors) in results.items():
+            links.append(KnowledgeChainLink(chain_id=pk, ancestor_id=pk, depth=0))
+            links.extend(
+                KnowledgeChainLink(chain_id=pk, ancestor=ancestor, depth=depth)
+                for depth, ancestor in enumerate(ancestors, start=1)
+            )
+        with transaction.atomic():
+            cls.objects.filter(pk__in=list(results)).delete()
+            cls.objects.bulk_create(chains, ignore_conflicts=True)
+            KnowledgeChainLink.objects.bulk_create(links, ignore_conflicts=True)
+        return results
+
+    @classmethod
+    def invalidate(cls, knowledge_ids):
+        """
+        Удаляет цепочки указанных знаний и всех знаний, в цепочки которых
+        они входят. Цепочки будут перестроены при следующем обращении.
+        """
+        knowledge_ids = [pk for pk in knowledge_ids if pk is not None]
+        if not knowledge_ids:
+            return
+        chain_ids = (KnowledgeChainLink.objects
+                     .filter(ancestor_id__in=knowledge_ids)
+                     .values_list('chain_id', flat=True))
+        cls.objects.filter(pk__in=list(chain_ids)).delete()
+
+    @classmethod
+    def invalidate_all(cls):
+        cls.objects.all().delete()
+
+
+class KnowledgeChainLink(models.Model):
+    """
+    Звено цепочки знания (таблица замыкания): знание-предок и его
+    удаленность от знания. Звено с depth=0 указывает на само знание
+    и служит признаком того, что цепочка построена.
+    """
+    chain = models.ForeignKey(KnowledgeChain,
+                              on_delete=models.CASCADE,
+                              related_name='links',
+                              verbose_name='Цепочка'
+                              )
+    ancestor = models.ForeignKey('Znanie',
+                                 on_delete=models.CASCADE,
+                                 related_name='chain_links',
+                                 verbose_name='Предок'
+                                 )
+    depth = models.PositiveSmallIntegerField(verbose_name='Удаленность')
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Звено цепочки знания'
+        verbose_name_plural = 'Звенья цепочек знаний'
+        unique_together = ('chain', 'depth')
@@ -0,0 +1,31 @@
+from django.db import models
+from django.db.models import F
+
+
+class KnowledgeGraphVersion(models.Model):
+    """
+    Номер версии графа знаний (знания, связи, категории, виды знаний
+    и связей). Хранится в единственной записи и увеличивается при каждом
+    изменении графа (см. drevo/signals.py); по нему процессы определяют,
+    что снимок графа в памяти (см. drevo/knowledge_graph.py) устарел.
+    """
+    version = models.PositiveBigIntegerField(default=0,
+                                             verbose_name='Версия'
+                                             )
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Версия графа знаний'
+        verbose_name_plural = 'Версия графа знаний'
+
+    def __str__(self):
+        return str(self.version)
+
+    @classmethod
+    def get_version(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=F('version') + 1):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
@@ -1,4 +1,5 @@
 from django.db import models
+from ..lookups import UnicodeLower
 
 
 class Tz(models.Model):
@@ -32,3 +33,5 @@ class Tz(models.Model):
         verbose_name = 'Вид знания'
         verbose_name_plural = 'Виды знания'
         ordering = ('order',)
+        # индекс по выражению сравнения name__lower=... (см. drevo/lookups.py)
+        indexes = [models.Index(UnicodeLower('name'), name='drevo_tz_name_lower')]
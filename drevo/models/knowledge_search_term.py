@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class KnowledgeSearchTerm(models.Model):
+    """
+    Элемент поискового индекса знаний: нормализованное слово (терм),
+    встречающееся в теме, содержании или комментарии к источнику знания.
+    """
+    TERM_MAX_LENGTH = 64
+
+    knowledge = models.ForeignKey('Znanie',
+                                  on_delete=models.CASCADE,
+                                  related_name='search_terms',
+                                  verbose_name='Знание'
+                                  )
+    term = models.CharField(max_length=TERM_MAX_LENGTH,
+                            verbose_name='Терм'
+                            )
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Терм поискового индекса'
+        verbose_name_plural = 'Поисковый индекс знаний'
+        unique_together = ('term', 'knowledge')
+
+    def __str__(self):
+        return self.term
@@ -1,4 +1,5 @@
 from django.db import models
+from ..lookups import UnicodeLower
 
 
 class Label(models.Model):
@@ -19,3 +20,5 @@ class Label(models.Model):
         verbose_name = 'Метка'
         verbose_name_plural = 'Метки'
         ordering = ('name',)
+        # индекс по выражению сравнения name__lower=... (см. drevo/lookups.py)
+        indexes = [models.Index(UnicodeLower('name'), name='drevo_label_name_lower')]
@@ -49,7 +49,7 @@ class Relation(models.Model):
 
     def get_grouped_relations(self):
         return list(sorted(
-            self.rz.base.all(),
+            self.rz.base.select_related('rz'),
             key=lambda x: x.rz.order if x.rz.order else 0,
             reverse=True
         ))
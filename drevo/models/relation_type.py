@@ -1,4 +1,5 @@
 from django.db import models
+from ..lookups import UnicodeLower
 
 
 class Tr(models.Model):
@@ -41,3 +42,5 @@ class Tr(models.Model):
         verbose_name = 'Вид связи'
         verbose_name_plural = 'Виды связи'
         ordering = ('order', 'name',)
+        # индекс по выражению сравнения name__lower=... (см. drevo/lookups.py)
+        indexes = [models.Index(UnicodeLower('name'), name='drevo_tr_name_lower')]
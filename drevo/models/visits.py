@@ -14,3 +14,9 @@ class Visits(models.Model):
                              )
 
     objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'znanie'),
+                                    name='drevo_visits_unique_user_znanie'),
+        ]
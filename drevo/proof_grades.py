@@ -0,0 +1,184 @@
+"""
+Расчет оценки доказательной базы знания.
+"""
+from django.core.cache import cache
+
+from .cache_versions import bump_cache_version, get_cache_version
+from .models.knowledge_grade import KnowledgeGrade
+from .models.knowledge_grade_scale import KnowledgeGradeScale
+from .models.relation_grade import RelationGrade
+from .relations_graph import traverse
+
+
+# Время хранения рассчитанных оценок в кэше, сек.
+CACHE_TIMEOUT = 60 * 60 * 24
+CACHE_PREFIX = 'proof_grades'
+
+
+class ProofGradeSnapshot:
+    """
+    Снимок оценок пользователя для дерева доводов знания.
+
+    При создании за несколько запросов (по одному на уровень дерева плюс
+    три на оценки и шкалу) загружает все доказательные связи поддерева,
+    оценки пользователем знаний и связей этого поддерева и оценку по умолчанию.
+    Дальнейший расчет выполняется в памяти с запоминанием результата по id знания.
+    """
+
+    def __init__(self, knowledge, user):
+        self.knowledge_id = knowledge.pk
+        self._memo = {}
+
+        graph = traverse([knowledge.pk],
+                         is_argument=True,
+                         can_be_rated=True,
+                         select_related=('tr',))
+        # {id базового знания: [связи-доводы]}
+        self.arguments = graph.children
+        knowledge_ids = graph.knowledge_ids
+
+        default_scale = KnowledgeGradeScale.objects.first()
+        self.default_grade = default_scale.get_base_grade() if default_scale else None
+
+        self.knowledge_grades = {
+            grade.knowledge_id: grade.grade.get_base_grade()
+            for grade in KnowledgeGrade.objects
+                                       .filter(user=user, knowledge_id__in=knowledge_ids)
+                                       .select_related('grade')
+        }
+        relation_ids = [relation.pk for relation in graph.relations]
+        self.relation_grades = {
+            grade.relation_id: grade.grade.get_base_grade()
+            for grade in RelationGrade.objects
+                                      .filter(user=user, relation_id__in=relation_ids)
+                                      .select_related('grade')
+        }
+
+    def get_knowledge_grade(self, knowledge_id):
+        """
+        Оценка знания пользователем (см. Znanie.get_users_grade).
+        """
+        return self.knowledge_grades.get(knowledge_id, self.default_grade)
+
+    def get_proof_weight(self, relation):
+        """
+        Вес довода (см. Relation.get_proof_weight).
+        """
+        relation_grade = self.relation_grades.get(relation.pk, self.default_grade)
+        proof_grade = self.get_knowledge_grade(relation.rz_id) * relation_grade
+        return proof_grade * (-2 * relation.tr.argument_type + 1)
+
+    def get_proof_base_grade(self, knowledge_id=None, variant=2):
+        """
+        Оценка доказательной базы знания: среднее положительных средних
+        оценок доводов по всем знаниям дерева доводов. Для самого знания
+        используется вариант расчета variant, для остальных знаний дерева -
+        вариант 2 (вес довода).
+        Возвращает 0, если положительных оценок нет.
+        """
+        if knowledge_id is None:
+            knowledge_id = self.knowledge_id
+        total, count = self._get_subtree_grades(knowledge_id, variant, set())
+        return total / count if count else 0
+
+    def get_common_grades(self, knowledge_id=None, variant=2):
+        """
+        Возвращает кортеж (общая оценка знания, оценка доказательной базы),
+        см. Znanie.get_common_grades.
+        """
+        if knowledge_id is None:
+            knowledge_id = self.knowledge_id
+        proof_base_value = self.get_proof_base_grade(knowledge_id, variant)
+        if not proof_base_value:
+            proof_base_value = self.default_grade
+        common_grade_value = (
+            proof_base_value + self.get_knowledge_grade(knowledge_id)) / 2
+        return common_grade_value, proof_base_value
+
+    def _get_subtree_grades(self, knowledge_id, variant, path):
+        """
+        Возвращает сумму и количество положительных средних оценок по поддереву.
+        Знания, уже находящиеся на текущем пути (циклы), пропускаются.
+        """
+        total, count, _ = self._get_subtree_grades_with_cycles(knowledge_id, variant, path)
+        return total, count
+
+    def _get_subtree_grades_with_cycles(self, knowledge_id, variant, path):
+        """
+        Возвращает кортеж (сумма, количество, признак полного поддерева).
+        Поддерево неполное, если в нем пропущено знание из-за цикла: такой
+        результат зависит от пути, которым достигнуто знание, поэтому
+        запоминается только результат полного поддерева.
+        """
+        key = (knowledge_id, variant)
+        if key in self._memo:
+            return (*self._memo[key], True)
+
+        arguments = self.arguments.get(knowledge_id)
+        if not arguments:
+            return 0, 0, True
+
+        if variant == 1:
+            values = [self.get_knowledge_grade(x.rz_id) for x in arguments]
+        else:
+            values = [self.get_proof_weight(x) for x in arguments]
+        level_value = sum(values) / len(values)
+        total, count = (level_value, 1) if level_value > 0 else (0, 0)
+        is_complete = True
+
+        path.add(knowledge_id)
+        for relation in arguments:
+            if relation.rz_id in path:
+                is_complete = False
+                continue
+            child_total, child_count, child_is_complete = \
+                self._get_subtree_grades_with_cycles(relation.rz_id, 2, path)
+            total += child_total
+            count += child_count
+            is_complete = is_complete and child_is_complete
+        path.remove(knowledge_id)
+
+        if is_complete:
+            self._memo[key] = total, count
+        return total, count, is_complete
+
+
+def _get_user_version_key(user_id):
+    return f'{CACHE_PREFIX}:version:user:{user_id}'
+
+
+def invalidate_proof_grades(user_id=None):
+    """
+    Делает устаревшими закэшированные оценки пользователя user_id,
+    а если пользователь не указан - оценки всех пользователей.
+    Вместо удаления ключей меняется номер версии, входящий в ключ.
+    """
+    if user_id is None:
+        key = f'{CACHE_PREFIX}:version'
+    else:
+        key = _get_user_version_key(user_id)
+    bump_cache_version(key)
+
+
+def get_cached_common_grades(knowledge, user, variant=2, knowledge_ids=()):
+    """
+    Возвращает словарь {id знания: (общая оценка, оценка доказательной базы)}
+    для knowledge и знаний его дерева доводов из knowledge_ids.
+    Отсутствующие в кэше оценки рассчитываются по одному снимку
+    ProofGradeSnapshot и сохраняются в кэш.
+    """
+    prefix = ':'.join((CACHE_PREFIX,
+                       get_cache_version(f'{CACHE_PREFIX}:version'),
+                       get_cache_version(_get_user_version_key(user.pk)),
+                       str(user.pk)))
+    keys = {f'{prefix}:{pk}:{variant}': pk for pk in (knowledge.pk, *knowledge_ids)}
+    grades = {keys[key]: value for key, value in cache.get_many(keys).items()}
+
+    missing_keys = [key for key, pk in keys.items() if pk not in grades]
+    if missing_keys:
+        snapshot = ProofGradeSnapshot(knowledge, user)
+        computed = {key: snapshot.get_common_grades(keys[key], variant)
+                    for key in missing_keys}
+        cache.set_many(computed, CACHE_TIMEOUT)
+        grades.update((keys[key], value) for key, value in computed.items())
+    return grades
@@ -0,0 +1,146 @@
+"""
+Обход графа знаний по связям Relation.
+
+Обход выполняется поуровнево: все знания очередного уровня (фронта)
+обрабатываются одним запросом (bz__in=фронт при обходе вниз, rz__in=фронт
+при обходе вверх), поэтому число запросов равно глубине обхода, а не
+числу знаний. Результат - граф RelationGraph в памяти, который можно
+многократно использовать без обращения к базе.
+"""
+import collections
+
+from .models import Relation
+
+DOWN = 'down'
+UP = 'up'
+
+
+class RelationGraph:
+    """
+    Подграф связей, полученный обходом от начальных знаний.
+
+    children - {id базового знания: [связи к связанным знаниям]},
+    parents - {id связанного знания: [связи к базовым знаниям]},
+    depths - {id знания: глубина, на которой знание впервые встретилось}.
+    Связи хранятся в порядке, заданном моделью Relation.
+    """
+
+    def __init__(self, start_ids):
+        self.start_ids = list(start_ids)
+        self.children = collections.defaultdict(list)
+        self.parents = collections.defaultdict(list)
+        self.depths = {pk: 0 for pk in self.start_ids}
+
+    def add(self, relation):
+        self.children[relation.bz_id].append(relation)
+        self.parents[relation.rz_id].append(relation)
+
+    @property
+    def knowledge_ids(self):
+        return set(self.depths)
+
+    @property
+    def relations(self):
+        return [relation
+                for relations in self.children.values()
+                for relation in relations]
+
+    def get_children(self, knowledge_id):
+        return self.children.get(knowledge_id, [])
+
+    def get_parents(self, knowledge_id):
+        return self.parents.get(knowledge_id, [])
+
+    def iter_bfs(self, direction=DOWN):
+        """
+        Возвращает id знаний графа в порядке обхода в ширину от начальных
+        знаний. Каждое знание выдается один раз.
+        """
+        visited = set(self.start_ids)
+        queue = collections.deque(self.start_ids)
+        while queue:
+            knowledge_id = queue.popleft()
+            yield knowledge_id
+            for next_id in self._get_neighbour_ids(knowledge_id, direction):
+                if next_id not in visited:
+                    visited.add(next_id)
+                    queue.append(next_id)
+
+    def iter_dfs(self, direction=DOWN):
+        """
+        Возвращает id знаний графа в порядке обхода в глубину от начальных
+        знаний. Каждое знание выдается один раз, циклы не приводят
+        к зацикливанию.
+        """
+        visited = set()
+        stack = list(reversed(self.start_ids))
+        while stack:
+            knowledge_id = stack.pop()
+            if knowledge_id in visited:
+                continue
+            visited.add(knowledge_id)
+            yield knowledge_id
+            stack.extend(reversed(self._get_neighbour_ids(knowledge_id, direction)))
+
+    def _get_neighbour_ids(self, knowledge_id, direction):
+        if direction == DOWN:
+            return [relation.rz_id for relation in self.get_children(knowledge_id)]
+        return [relation.bz_id for relation in self.get_parents(knowledge_id)]
+
+
+def traverse(start_ids,
+             direction=DOWN,
+             max_depth=None,
+             is_published=None,
+             is_systemic=None,
+             is_argument=None,
+             can_be_rated=None,
+             select_related=()):
+    """
+    Обходит граф связей от знаний start_ids вниз (от базового знания
+    к связанным, direction=DOWN) или вверх (direction=UP) не глубже
+    max_depth уровней (None - без ограничения).
+
+    Фильтры (None - фильтр не применяется):
+    is_published - опубликованность связи и знания, к которому она ведет;
+    is_systemic, is_argument - признаки вида связи Tr;
+    can_be_rated - признак вида знания Tz у знания, к которому ведет связь.
+
+    Знания, уже встреченные при обходе, повторно не раскрываются,
+    но связи к ним попадают в граф, поэтому циклы сохраняются в графе
+    и не приводят к зацикливанию обхода.
+    """
+    if direction == DOWN:
+        from_field, to_field = 'bz', 'rz'
+    elif direction == UP:
+        from_field, to_field = 'rz', 'bz'
+    else:
+        raise ValueError(f'Некорректное направление обхода {direction}')
+
+    filters = {}
+    if is_published is not None:
+        filters['is_published'] = is_published
+        filters[f'{to_field}__is_published'] = is_published
+    if is_systemic is not None:
+        filters['tr__is_systemic'] = is_systemic
+    if is_argument is not None:
+        filters['tr__is_argument'] = is_argument
+    if can_be_rated is not None:
+        filters[f'{to_field}__tz__can_be_rated'] = can_be_rated
+
+    graph = RelationGraph(start_ids)
+    frontier = set(graph.start_ids)
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        relations = (Relation.objects
+                     .filter(**{f'{from_field}_id__in': frontier}, **filters)
+                     .select_related(*select_related))
+        frontier = set()
+        for relation in relations:
+            graph.add(relation)
+            next_id = getattr(relation, f'{to_field}_id')
+            if next_id not in graph.depths:
+                graph.depths[next_id] = depth
+                frontier.add(next_id)
+    return graph
@@ -1,7 +1,9 @@
 """
 Функции для построения деревьев отношений.
 """
-from .models import Author, Relation, Znanie, Category, Tr
+from .models import Author, Relation, Znanie, Category, Tr, KnowledgeChain, KnowledgeChainLink
+from .knowledge_graph import get_graph_for_knowledge
+from .sibling_index import get_sibling_group, get_sibling_ids, get_window
 import collections
 
 
@@ -9,85 +11,100 @@ def get_knowledges_by_categories(knowledges_queryset):
     """
     Распределяет дополнительные знания по категориям.
     Возвращает список категорий, к которым относятся входные знания,
-    и словарь, в котором ключ - категория, а значение - 
-    словарь со списками осн. и доп. знаний в этой категории:
+    и словарь, в котором ключ - id категории (None для знаний без
+    категории), а значение - словарь со списками осн. и доп. знаний
+    в этой категории:
     {
-        category_name : {
+        category_id : {
             'base' : [список основных знаний],
             'additional' : [список дополнительных знаний],
         }
     }
     """
+    knowledges_list = list(knowledges_queryset.select_related('tz'))
+    categories_by_knowledge = get_categories_for_knowledges(knowledges_list)
+
     # инициализируем словарь
     # используем defaultdict, чтобы при первом обращении по
-    # ключу (еще несуществующему) возвращался пустой словарь
-    knowledges_by_categories = collections.defaultdict(dict)
-
-    # получаем категории для знаний автора
-    for knowledge in knowledges_queryset:
+    # ключу (еще несуществующему) возвращался словарь с пустыми
+    # списками основных и дополнительных знаний
+    knowledges_by_categories = collections.defaultdict(
+        lambda: {'base': [], 'additional': []})
+    categories = {}
 
+    for knowledge in knowledges_list:
         # получаем категорию для текущего знания
-        # если в результате поиска категории нет, в словарь
-        # добавляет псевдокатегория с именем 'None'
-        category = get_category_for_knowledge(knowledge)
-        category_name = category.name if category else 'None'
-
-        # открываем словарь с категорией текущего знания
-        knowledges = knowledges_by_categories[category_name]
-        # сразу создаем два ключа и присоединяем к ним по пустому списку,
-        # один для основных знаний, другой для дополнительных.
-        # это позволит обойтись далее без проверок на существование этих списков,
-        # а в шаблоне при отсутствии соотв. знаний в категории будет выводится пустой лист.
-        if not 'base' in knowledges:
-            knowledges['base'] = []
-        if not 'additional' in knowledges:
-            knowledges['additional'] = []
+        # если в результате поиска категории нет, знание
+        # добавляется в псевдокатегорию с ключом None
+        category = categories_by_knowledge[knowledge.pk]
+        category_id = category.pk if category else None
+        if category:
+            categories[category.pk] = category
 
         # если категория указана, то добавляем знание в список
         # основных знаний, если нет - то дополнительных
-        if knowledge.category:
+        knowledges = knowledges_by_categories[category_id]
+        if knowledge.category_id:
             knowledges['base'].append(knowledge)
         else:
             knowledges['additional'].append(knowledge)
 
-    # список id категорий, в которых есть знания автора
-    ids = list(knowledges_by_categories.keys())
-    if 'None' in ids:
-        ids.remove('None')
-    categories_id_list = [Category.objects.get(name=x).id for x in ids]
-
     # формируем список категорий в соответствии с порядком, заданным mptt
-    
-    categories = (Category.tree_objects
-                    .filter(pk__in=categories_id_list)
-                    .exclude(is_published=False))
+    categories = sorted(categories.values(),
+                        key=lambda category: (category.tree_id, category.lft))
 
+    return categories, dict(knowledges_by_categories)
 
-    return categories, knowledges_by_categories
+
+def get_categories_for_knowledges(knowledges) -> dict:
+    """
+    Возвращает словарь {id знания: категория или None} для списка знаний
+    (см. get_category_for_knowledge). Готовые цепочки читаются одним
+    запросом, недостающие строятся вместе, по запросу на уровень связей.
+    """
+    knowledge_ids = [knowledge.pk for knowledge in knowledges]
+    graph = get_graph_for_knowledge(knowledges[0]) if knowledges else None
+    if graph and all(pk in graph.knowledges for pk in knowledge_ids):
+        return {pk: graph.walk(pk)[0] for pk in knowledge_ids}
+    categories = {
+        chain.knowledge_id: chain.category
+        for chain in (KnowledgeChain.objects
+                      .filter(knowledge_id__in=knowledge_ids)
+                      .select_related('category'))
+    }
+    missing_ids = [pk for pk in knowledge_ids if pk not in categories]
+    if missing_ids:
+        missing = Znanie.objects.filter(pk__in=missing_ids).select_related('category')
+        categories.update(
+            (pk, category)
+            for pk, (category, _) in KnowledgeChain.build_many(missing).items()
+        )
+    return categories
 
 
 def get_category_for_knowledge(knowledge: Znanie) -> [None, Category]:
     """
     Возвращает категорию, к которой принадлежит знание. 
     Если категория назначена непосредственно (основное знание), то возвращается она.
-    Если категории не назначена (дополнительное знание), то производится
-    рекурсивный поиск основного знания по цепочке через сущность Relation.
-    Поиск останавливается и возвращается None, если очередное знание в цепочке
-    окажется неопубликованным.
+    Если категории не назначена (дополнительное знание), то категория берется
+    у основного знания, с которым знание связано цепочкой через сущность Relation.
+    Возвращается None, если очередное знание в цепочке окажется неопубликованным.
+
+    Цепочка хранится в KnowledgeChain и строится при первом обращении,
+    поэтому ответ не зависит от длины цепочки - это один запрос по ключу.
     """
-    if knowledge.category and knowledge.category.is_published and knowledge.is_published:
-        return knowledge.category
-    elif knowledge.is_published:
-        # ищем связь с другим знанием и рекурсивно получаем категорию для базового знания
-        relation = Relation.objects.filter(rz=knowledge,
-                                           is_published=True).exclude(tr__is_systemic=True).first()
-        if relation:
-            base_knowledge = relation.bz
-            return get_category_for_knowledge(base_knowledge)
-        else:
-            return None
-    else:
-        return None
+    graph = get_graph_for_knowledge(knowledge)
+    if graph:
+        category, _ = graph.walk(knowledge.pk)
+        return category
+    chain = (KnowledgeChain.objects
+             .filter(knowledge_id=knowledge.pk)
+             .select_related('category')
+             .first())
+    if chain:
+        return chain.category
+    category, _ = KnowledgeChain.build(knowledge)
+    return category
 
 
 def get_ancestors_for_knowledge(knowledge: Znanie) -> list:
@@ -100,30 +117,19 @@ def get_ancestors_for_knowledge(knowledge: Znanie) -> list:
     (если имеется) - первое в списке, а знание, связанное непосредственно с текущим, 
     - последнее.
     """
-    chain = []
-
-    def get_ancestors(knowledge: Znanie):
-        """
-        Рекурсивно ищет предков текущего знания вплоть до основного знания,
-        попутно заполняя список chain найденными предками.
-        """
-        if knowledge.category and knowledge.category.is_published and knowledge.is_published:
-            return None
-        elif knowledge.is_published:
-            # ищем связь с другим знанием и рекурсивно получаем следующее знание в цепочке
-            relation = Relation.objects.filter(rz=knowledge,
-                                               is_published=True).exclude(tr__is_systemic=True).first()
-            if relation:
-                base_knowledge = relation.bz
-                chain.append(base_knowledge)
-                return get_ancestors(base_knowledge)
-            else:
-                return None
-        else:
-            return None
-
-    get_ancestors(knowledge)
-    return chain[::-1]
+    graph = get_graph_for_knowledge(knowledge)
+    if graph:
+        _, ancestors = graph.walk(knowledge.pk)
+        return ancestors[::-1]
+    links = list(KnowledgeChainLink.objects
+                 .filter(chain_id=knowledge.pk)
+                 .select_related('ancestor')
+                 .order_by('-depth'))
+    if links:
+        # последнее звено (depth=0) - само знание
+        return [link.ancestor for link in links[:-1]]
+    _, ancestors = KnowledgeChain.build(knowledge)
+    return ancestors[::-1]
 
 
 def get_children_for_knowledge(knowledge):
@@ -140,23 +146,35 @@ def get_children_for_knowledge(knowledge):
 
 
 def get_children_by_relation_type_for_knowledge(knowledge):
+    """
+    Возвращает словарь, в котором ключ - вид связи, а значение - список
+    опубликованных знаний, связанных с knowledge этим видом связи.
+    Виды связи упорядочены по Tr.order, знания - по виду знания и Znanie.order.
+    Все данные получаются одним запросом, сортировка выполняется в памяти.
+    """
 
     def sort_by_relation_type(s):
-        relation_type = Tr.objects.get(name=s[0])
-        order = relation_type.order
-        return order if order else 0
+        return s[0].order or 0
 
     def sort_by_knoweledge_type(s):
         order_tz = s.tz.order
         order_z = s.order or 0
         return order_tz, order_z
 
-    children = get_children_for_knowledge(knowledge)
+    graph = get_graph_for_knowledge(knowledge)
+    if graph:
+        return graph.get_children_by_relation_type(knowledge.pk)
+
+    if not knowledge.is_published:
+        return {}
+
+    relations = (Relation.objects
+                 .filter(bz=knowledge, is_published=True, rz__is_published=True)
+                 .select_related('tr', 'rz__tz', 'rz__author'))
     children_grouped_by_relation_type = {}
-    for child in children:
-        relation = Relation.objects.filter(bz=knowledge, rz=child).first()
+    for relation in relations:
         children_grouped_by_relation_type.setdefault(
-            relation.tr, []).append(child)
+            relation.tr, []).append(relation.rz)
 
     # Сортировка по видам знания и его параметру order
     for relation_type, children in children_grouped_by_relation_type.items():
@@ -168,25 +186,25 @@ def get_children_by_relation_type_for_knowledge(knowledge):
     return dict(children_sorted_by_relation_order)
 
 
-def get_siblings_for_knowledge(knowledge: Znanie) -> [None, list]:
+def get_siblings_for_knowledge(knowledge: Znanie, window=None) -> [None, list]:
     """
     Возвращает список знаний, имеющих того же предка, что
-    и knowledge.
+    и knowledge, в порядке Znanie.order.
+    Если задано window, возвращается не более window знаний,
+    предшествующих knowledge, и window знаний, следующих за ним.
+    Списки соседей хранятся в индексе (см. sibling_index).
     """
-    if knowledge.category and knowledge.category.is_published and knowledge.is_published:
-        return list(Znanie.published.filter(category=knowledge.category).exclude(pk=knowledge.pk))
-    elif knowledge.is_published:
-        # находим базовое знание
-        # TODO связь znanie - Relation д.б. единственно возможной.
-        relation = Relation.objects.filter(rz=knowledge,
-                                           is_published=True).exclude(tr__is_systemic=True).first()
-        if relation:
-            base_knowledge = relation.bz
-            return list(Znanie.published.filter(related__bz=base_knowledge,
-                                                related__is_published=True).
-                        exclude(pk=knowledge.pk).
-                        exclude(pk=base_knowledge.pk))
-        else:
+    graph = get_graph_for_knowledge(knowledge)
+    if graph:
+        ids = graph.get_sibling_ids(knowledge.pk)
+        if ids is None:
             return None
-    else:
+        return [graph.knowledges[pk] for pk in get_window(ids, knowledge.pk, window)]
+
+    group = get_sibling_group(knowledge)
+    if group is None:
         return None
+    ids = get_window(get_sibling_ids(group), knowledge.pk, window)
+    knowledges = Znanie.objects.in_bulk(ids)
+    # знание могло быть удалено после построения группы
+    return [knowledges[pk] for pk in ids if pk in knowledges]
@@ -0,0 +1,96 @@
+"""
+Кэш результатов поиска.
+
+Для каждого поискового запроса в кэше хранятся id первых
+CACHED_IDS_LIMIT найденных записей по порядку и общее число результатов,
+ключ строится по нормализованной строке параметров запроса (без номера
+страницы). При листании первых страниц из кэша берется срез списка id,
+а сами записи загружаются одним запросом по pk__in; id дальних страниц
+запрашиваются у базы, как без кэша.
+
+Изменение знаний, тегов, авторов и данных, по которым фильтруется поиск
+(категорий, видов знаний и связей, связей), меняет номер версии, входящий
+в ключ (см. drevo/signals.py), поэтому ранее сохраненные результаты
+устаревают.
+"""
+import hashlib
+import urllib
+
+from django.core.cache import cache
+
+from .cache_versions import bump_cache_version, get_cache_version
+from .search_index import SearchResults
+
+# Время хранения результатов поиска в кэше, сек.
+CACHE_TIMEOUT = 60 * 10
+CACHE_PREFIX = 'search'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+# Наибольшее число id результатов, сохраняемых в кэше для запроса
+CACHED_IDS_LIMIT = 500
+
+
+class CachedIds:
+    """
+    Упорядоченная последовательность id результатов поиска: первые id
+    берутся из кэша (head), остальные - из queryset ids.
+    """
+
+    def __init__(self, head, count, ids):
+        self.head = head
+        self.total = count
+        self.ids = ids
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, key):
+        if key.stop is not None and key.stop <= len(self.head) and (key.step or 1) > 0:
+            return self.head[key]
+        return list(self.ids[key])
+
+
+def invalidate_search_cache():
+    bump_cache_version(VERSION_KEY)
+
+
+def normalize_parameters(parameters_string):
+    """
+    Приводит строку параметров запроса к каноническому виду: пустые
+    параметры отбрасываются, значения приводятся к нижнему регистру
+    (поиск регистронезависимый), параметры сортируются.
+    """
+    parameters = sorted(
+        (name, ' '.join(value.lower().split()))
+        for name, value in urllib.parse.parse_qsl(parameters_string)
+        if value.strip()
+    )
+    return urllib.parse.urlencode(parameters)
+
+
+def get_cached_search_results(name, parameters_string, results):
+    """
+    Возвращает SearchResults по закэшированному списку id результатов
+    поиска name с параметрами parameters_string.
+    results - queryset или SearchResults, по которому список id
+    вычисляется при отсутствии его в кэше.
+    """
+    if not isinstance(results, SearchResults):
+        results = SearchResults(results.values_list('pk', flat=True), results)
+
+    parameters_hash = hashlib.md5(
+        normalize_parameters(parameters_string).encode()).hexdigest()
+    key = f'{CACHE_PREFIX}:{get_cache_version(VERSION_KEY)}:{name}:{parameters_hash}'
+    cached = cache.get(key)
+    if cached is None:
+        head = list(results.ids[:CACHED_IDS_LIMIT + 1])
+        if len(head) > CACHED_IDS_LIMIT:
+            head = head[:CACHED_IDS_LIMIT]
+            count = results.count()
+        else:
+            count = len(head)
+        cached = head, count
+        cache.set(key, cached, CACHE_TIMEOUT)
+    head, count = cached
+    if count == len(head):
+        return SearchResults(head, results.objects)
+    return SearchResults(CachedIds(head, count, results.ids), results.objects)
@@ -0,0 +1,148 @@
+"""
+Поисковый индекс знаний.
+
+Текст темы, содержания и комментария к источнику разбивается на слова,
+слова нормализуются и сохраняются в KnowledgeSearchTerm. Запрос
+нормализуется тем же способом, поэтому поиск сводится к сравнению
+термов на равенство; знания с большим числом совпавших слов выводятся первыми.
+
+Нормализация слова: приведение к нижнему регистру, замена ё на е,
+отбрасывание стоп-слов и выделение основы стеммером Snowball.
+"""
+import functools
+import re
+from html import unescape
+
+import snowballstemmer
+
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet
+from django.utils.html import strip_tags
+
+from .models import KnowledgeSearchTerm
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'был', 'была', 'были', 'было', 'быть', 'в', 'вам', 'вас',
+    'во', 'вот', 'все', 'всех', 'вы', 'где', 'да', 'для', 'до', 'его', 'ее',
+    'если', 'есть', 'еще', 'же', 'за', 'и', 'из', 'или', 'им', 'их', 'к',
+    'как', 'когда', 'кто', 'ли', 'мне', 'мы', 'на', 'над', 'нас', 'не', 'него',
+    'нее', 'нет', 'ни', 'но', 'о', 'об', 'он', 'она', 'они', 'от', 'по', 'под',
+    'при', 'про', 'с', 'со', 'так', 'там', 'то', 'тот', 'ты', 'у', 'уже',
+    'чем', 'что', 'чтобы', 'это', 'этот', 'я',
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'with',
+))
+
+russian_stemmer = snowballstemmer.stemmer('russian')
+english_stemmer = snowballstemmer.stemmer('english')
+
+# поля знания, по которым строится индекс
+INDEXED_FIELDS = ('name', 'content', 'source_com')
+
+
+@functools.lru_cache(maxsize=10000)
+def normalize_word(word):
+    """
+    Возвращает терм для слова или None, если слово - стоп-слово.
+    """
+    word = word.casefold().replace('ё', 'е')
+    if word in STOP_WORDS:
+        return None
+    stemmer = russian_stemmer if CYRILLIC_RE.search(word) else english_stemmer
+    return stemmer.stemWord(word)[:KnowledgeSearchTerm.TERM_MAX_LENGTH]
+
+
+def get_terms(text):
+    """
+    Возвращает множество нормализованных слов текста.
+    Html-разметка (содержание знания хранится в html) не учитывается.
+    """
+    if not text:
+        return set()
+    text = unescape(strip_tags(text))
+    terms = {normalize_word(word) for word in WORD_RE.findall(text)}
+    terms.discard(None)
+    return terms
+
+
+def get_knowledge_terms(knowledge):
+    terms = set()
+    for field_name in INDEXED_FIELDS:
+        terms |= get_terms(getattr(knowledge, field_name))
+    return terms
+
+
+def index_knowledge(knowledge):
+    """
+    Перестраивает термы знания в поисковом индексе.
+    """
+    terms = get_knowledge_terms(knowledge)
+    with transaction.atomic():
+        KnowledgeSearchTerm.objects.filter(knowledge_id=knowledge.pk).delete()
+        KnowledgeSearchTerm.objects.bulk_create(
+            [KnowledgeSearchTerm(knowledge_id=knowledge.pk, term=term) for term in terms],
+            ignore_conflicts=True
+        )
+
+
+class SearchResults:
+    """
+    Ленивая упорядоченная последовательность результатов поиска.
+
+    Поддерживает count() и срезы, поэтому Paginator запрашивает только
+    количество результатов и id записей нужной страницы (ids - queryset
+    или список id), после чего сами записи страницы загружаются одним
+    запросом из objects по pk__in с сохранением порядка ids.
+    """
+
+    def __init__(self, ids, objects):
+        self.ids = ids
+        self.objects = objects
+
+    def count(self):
+        if isinstance(self.ids, QuerySet):
+            return self.ids.count()
+        return len(self.ids)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            results = self[key:key + 1]
+            if not results:
+                raise IndexError('Индекс вне диапазона результатов поиска')
+            return results[0]
+        ids = list(self.ids[key])
+        objects = self.objects.filter(pk__in=ids).order_by()
+        objects = {obj.pk: obj for obj in objects}
+        return [objects[pk] for pk in ids if pk in objects]
+
+
+def search_knowledges(knowledges, query):
+    """
+    Отбирает из queryset knowledges знания, содержащие слова запроса query.
+    Знания упорядочиваются по убыванию числа совпавших слов (search_rank),
+    затем по теме. Возвращает SearchResults.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return knowledges.none()
+    ids = (knowledges
+           .prefetch_related(None)
+           .filter(search_terms__term__in=terms)
+           .values('pk')
+           .annotate(search_rank=Count('search_terms', distinct=True))
+           .order_by('-search_rank', 'name')
+           .values_list('pk', flat=True))
+    objects = knowledges.annotate(
+        search_rank=Count('search_terms',
+                          filter=Q(search_terms__term__in=terms),
+                          distinct=True))
+    return SearchResults(ids, objects)
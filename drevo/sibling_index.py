@@ -0,0 +1,95 @@
+"""
+Индекс соседних знаний (см. relations_tree.get_siblings_for_knowledge).
+
+Соседние знания образуют группу: опубликованные знания опубликованной
+категории либо опубликованные знания, связанные с одним базовым знанием.
+Для каждой группы в кэше хранится список id знаний в порядке Znanie.order,
+поэтому страница знания загружает соседей одним запросом по pk__in,
+а при заданном окне - только соседей, ближайших к текущему знанию.
+
+Изменение знаний, связей, категорий и видов связи (см. drevo/signals.py)
+меняет номер версии, входящий в ключ, поэтому группы строятся заново
+только после изменений.
+"""
+from django.core.cache import cache
+
+from .cache_versions import bump_cache_version, get_cache_version
+from .models import Relation, Znanie
+
+# Время хранения групп в кэше, сек.
+CACHE_TIMEOUT = 60 * 60 * 24
+CACHE_PREFIX = 'siblings'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+
+# Виды групп соседних знаний
+CATEGORY = 'category'
+KNOWLEDGE = 'knowledge'
+
+
+def get_sibling_group(knowledge):
+    """
+    Возвращает ключ группы соседних знаний: (CATEGORY, id категории) для
+    основного знания опубликованной категории, (KNOWLEDGE, id базового
+    знания) для остальных знаний; None, если у знания нет соседей.
+    """
+    if not knowledge.is_published:
+        return None
+    if knowledge.category and knowledge.category.is_published:
+        return CATEGORY, knowledge.category_id
+    # TODO связь znanie - Relation д.б. единственно возможной.
+    base_id = (Relation.objects
+               .filter(rz=knowledge, is_published=True)
+               .exclude(tr__is_systemic=True)
+               .values_list('bz_id', flat=True)
+               .first())
+    if base_id is None:
+        return None
+    return KNOWLEDGE, base_id
+
+
+def build_sibling_ids(group):
+    """
+    Возвращает список id опубликованных знаний группы в порядке Znanie.order.
+    """
+    kind, pk = group
+    knowledges = Znanie.published.order_by('order', 'pk')
+    if kind == CATEGORY:
+        knowledges = knowledges.filter(category_id=pk)
+    else:
+        knowledges = (knowledges
+                      .filter(related__bz_id=pk, related__is_published=True)
+                      .exclude(pk=pk))
+    # знание может быть связано с базовым знанием несколькими связями
+    return list(dict.fromkeys(knowledges.values_list('pk', flat=True)))
+
+
+def get_sibling_ids(group):
+    """
+    Возвращает закэшированный результат build_sibling_ids.
+    """
+    kind, pk = group
+    key = f'{CACHE_PREFIX}:{get_cache_version(VERSION_KEY)}:{kind}:{pk}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = build_sibling_ids(group)
+        cache.set(key, ids, CACHE_TIMEOUT)
+    return ids
+
+
+def get_window(ids, knowledge_id, window=None):
+    """
+    Возвращает id соседей знания knowledge_id из упорядоченного списка ids:
+    не более window знаний до и window знаний после текущего
+    (при window=None - все знания списка, кроме текущего).
+    """
+    if window is None:
+        return [pk for pk in ids if pk != knowledge_id]
+    try:
+        position = ids.index(knowledge_id)
+    except ValueError:
+        return ids[:2 * window]
+    return ids[max(position - window, 0):position] + ids[position + 1:position + 1 + window]
+
+
+def invalidate_sibling_index():
+    bump_cache_version(VERSION_KEY)
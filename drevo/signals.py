@@ -0,0 +1,315 @@
+"""
+Обработчики сигналов, поддерживающие в актуальном состоянии
+денормализованные данные приложения.
+"""
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from loguru import logger
+from mptt.signals import node_moved
+
+from .category_tree import invalidate_category_tree
+from .comment_threads import invalidate_comments_cache
+from .knowledge_graph import invalidate_knowledge_graph
+from .models import (Author, AuthorType, Category, Comment, KnowledgeChain,
+                     Label, Relation, Tr, Tz, Znanie, ZnImage, ZnRating)
+from .models.knowledge_grade import KnowledgeGrade
+from .models.knowledge_grade_scale import KnowledgeGradeScale
+from .models.relation_grade import RelationGrade
+from .models.relation_grade_scale import RelationGradeScale
+from .proof_grades import invalidate_proof_grades
+from .search_cache import invalidate_search_cache
+from .search_index import index_knowledge
+from .sibling_index import invalidate_sibling_index
+from .thumbnails import AVATAR, PHOTO, delete_thumbnails, make_thumbnails
+from users.models import Profile
+
+
+@receiver(pre_save, sender=Relation)
+def invalidate_chain_before_relation_change(sender, instance, **kwargs):
+    """
+    При изменении связи цепочка прежнего связанного знания тоже устаревает.
+    """
+    if instance.pk:
+        old_rz_id = (Relation.objects
+                     .filter(pk=instance.pk)
+                     .values_list('rz_id', flat=True)
+                     .first())
+        if old_rz_id != instance.rz_id:
+            KnowledgeChain.invalidate([old_rz_id])
+
+
+@receiver(post_save, sender=Relation)
+@receiver(post_delete, sender=Relation)
+def invalidate_chain_on_relation_change(sender, instance, **kwargs):
+    KnowledgeChain.invalidate([instance.rz_id])
+
+
+@receiver(post_save, sender=Znanie)
+def invalidate_chain_on_knowledge_change(sender, instance, created, **kwargs):
+    if not created:
+        KnowledgeChain.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tr)
+def invalidate_all_chains(sender, **kwargs):
+    """
+    Публикация категории или смена системности вида связи может изменить
+    цепочки любых знаний, поэтому сбрасываются все цепочки.
+    """
+    KnowledgeChain.invalidate_all()
+
+
+RATING_COUNTERS = {
+    ZnRating.LIKE: 'likes_count',
+    ZnRating.DISLIKE: 'dislikes_count',
+}
+
+
+def get_rating_counter(znanie_id, value):
+    """
+    Возвращает (id знания, счетчик), в котором учитывается оценка,
+    или None, если оценка не учитывается.
+    """
+    field_name = RATING_COUNTERS.get(value)
+    return (znanie_id, field_name) if field_name else None
+
+
+def get_comment_counter(znanie_id, parent_id):
+    """
+    Возвращает (id знания, счетчик), в котором учитывается комментарий:
+    учитываются комментарии первого уровня, в том числе снятые
+    с публикации (они выводятся в списке как удаленные).
+    """
+    if parent_id is None:
+        return znanie_id, 'comments_count'
+    return None
+
+
+def move_counter(old, new):
+    """
+    Переносит единицу из счетчика old в счетчик new (любой из них
+    может быть None).
+    """
+    if old == new:
+        return
+    if old:
+        Znanie.update_counters(old[0], **{old[1]: -1})
+    if new:
+        Znanie.update_counters(new[0], **{new[1]: 1})
+
+
+@receiver(pre_save, sender=ZnRating)
+def remember_counted_rating(sender, instance, **kwargs):
+    old = None
+    if instance.pk:
+        row = (ZnRating.objects
+               .filter(pk=instance.pk)
+               .values_list('znanie_id', 'value')
+               .first())
+        old = get_rating_counter(*row) if row else None
+    instance._counter_before_save = old
+
+
+@receiver(post_save, sender=ZnRating)
+def update_rating_counters(sender, instance, **kwargs):
+    move_counter(getattr(instance, '_counter_before_save', None),
+                 get_rating_counter(instance.znanie_id, instance.value))
+
+
+@receiver(post_delete, sender=ZnRating)
+def update_rating_counters_on_delete(sender, instance, **kwargs):
+    move_counter(get_rating_counter(instance.znanie_id, instance.value), None)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_counted_comment(sender, instance, **kwargs):
+    old = None
+    if instance.pk:
+        row = (Comment.objects
+               .filter(pk=instance.pk)
+               .values_list('znanie_id', 'parent_id')
+               .first())
+        old = get_comment_counter(*row) if row else None
+    instance._counter_before_save = old
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_counter(sender, instance, **kwargs):
+    move_counter(getattr(instance, '_counter_before_save', None),
+                 get_comment_counter(instance.znanie_id, instance.parent_id))
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_answers_count(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик ответов родительского комментария. post_delete
+    отправляется после удаления из таблицы всех комментариев операции,
+    поэтому родитель, удаленный вместе с ответом, не изменяется.
+    """
+    if instance.parent_id:
+        (Comment.objects
+         .filter(pk=instance.parent_id)
+         .update(answers_count=F('answers_count') - 1))
+
+
+@receiver(post_delete, sender=Comment)
+def update_comments_counter_on_delete(sender, instance, **kwargs):
+    move_counter(get_comment_counter(instance.znanie_id, instance.parent_id), None)
+
+
+@receiver(post_save, sender=KnowledgeGrade)
+@receiver(post_delete, sender=KnowledgeGrade)
+@receiver(post_save, sender=RelationGrade)
+@receiver(post_delete, sender=RelationGrade)
+def invalidate_users_proof_grades(sender, instance, **kwargs):
+    invalidate_proof_grades(instance.user_id)
+
+
+@receiver(post_save, sender=KnowledgeGradeScale)
+@receiver(post_delete, sender=KnowledgeGradeScale)
+@receiver(post_save, sender=RelationGradeScale)
+@receiver(post_delete, sender=RelationGradeScale)
+@receiver(post_save, sender=Relation)
+@receiver(post_delete, sender=Relation)
+@receiver(post_save, sender=Tr)
+@receiver(post_save, sender=Tz)
+@receiver(post_save, sender=Znanie)
+def invalidate_all_proof_grades(sender, **kwargs):
+    """
+    Изменение шкал, доводов, видов связи и знаний влияет на оценки
+    всех пользователей.
+    """
+    invalidate_proof_grades()
+
+
+@receiver(post_save, sender=Znanie)
+def update_search_index(sender, instance, **kwargs):
+    index_knowledge(instance)
+
+
+@receiver(post_save, sender=Znanie)
+@receiver(post_delete, sender=Znanie)
+@receiver(m2m_changed, sender=Znanie.labels.through)
+@receiver(post_save, sender=Label)
+@receiver(post_delete, sender=Label)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=AuthorType)
+@receiver(post_delete, sender=AuthorType)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tz)
+@receiver(post_delete, sender=Tz)
+@receiver(post_save, sender=Tr)
+@receiver(post_delete, sender=Tr)
+@receiver(post_save, sender=Relation)
+@receiver(post_delete, sender=Relation)
+def invalidate_search_results(sender, **kwargs):
+    """
+    Сбрасывает кэш результатов поиска после обновления поискового индекса
+    и данных, по которым фильтруется поиск.
+    """
+    invalidate_search_cache()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+@receiver(post_save, sender=Znanie)
+@receiver(post_delete, sender=Znanie)
+def invalidate_category_tree_cache(sender, **kwargs):
+    invalidate_category_tree()
+
+
+@receiver(post_save, sender=Znanie)
+@receiver(post_delete, sender=Znanie)
+@receiver(post_save, sender=Relation)
+@receiver(post_delete, sender=Relation)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+@receiver(post_save, sender=Tr)
+@receiver(post_delete, sender=Tr)
+@receiver(post_save, sender=Tz)
+@receiver(post_delete, sender=Tz)
+def invalidate_knowledge_graph_snapshot(sender, **kwargs):
+    invalidate_knowledge_graph()
+
+
+@receiver(post_save, sender=Znanie)
+@receiver(post_delete, sender=Znanie)
+@receiver(post_save, sender=Relation)
+@receiver(post_delete, sender=Relation)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tr)
+@receiver(post_delete, sender=Tr)
+def invalidate_sibling_groups(sender, **kwargs):
+    invalidate_sibling_index()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments_pages(sender, instance, **kwargs):
+    """
+    Новые комментарии, их изменение, модерация (снятие с публикации)
+    и удаление сбрасывают отрисованные страницы комментариев знания.
+    """
+    invalidate_comments_cache(instance.znanie_id)
+
+
+@receiver(post_save, sender=ZnImage)
+@receiver(post_save, sender=Profile)
+def create_thumbnails(sender, instance, **kwargs):
+    """
+    Создает уменьшенные копии загруженного фото знания или аватара.
+    Ошибка создания копий не мешает сохранению записи: недостающие
+    копии будут созданы при выводе изображения.
+    """
+    if sender is ZnImage:
+        field_file, kind = instance.photo, PHOTO
+    else:
+        field_file, kind = instance.avatar, AVATAR
+    if not field_file:
+        return
+    try:
+        make_thumbnails(field_file, kind)
+    except Exception:
+        logger.exception(f'Не удалось создать копии изображения {field_file.name}')
+
+
+IMAGE_FIELDS = {
+    ZnImage: 'photo',
+    Profile: 'avatar',
+}
+
+
+@receiver(pre_save, sender=ZnImage)
+@receiver(pre_save, sender=Profile)
+def delete_replaced_thumbnails(sender, instance, **kwargs):
+    """
+    Удаляет копии прежнего изображения при его замене.
+    """
+    if not instance.pk:
+        return
+    field_name = IMAGE_FIELDS[sender]
+    old_name = (sender.objects
+                .filter(pk=instance.pk)
+                .values_list(field_name, flat=True)
+                .first())
+    if old_name and old_name != getattr(instance, field_name).name:
+        delete_thumbnails(old_name, sender._meta.get_field(field_name).storage)
+
+
+@receiver(post_delete, sender=ZnImage)
+@receiver(post_delete, sender=Profile)
+def delete_removed_thumbnails(sender, instance, **kwargs):
+    """
+    Удаляет копии изображения удаленной записи.
+    """
+    field_file = getattr(instance, IMAGE_FIELDS[sender])
+    if field_file:
+        delete_thumbnails(field_file.name, field_file.storage)
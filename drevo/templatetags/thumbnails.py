@@ -0,0 +1,34 @@
+"""
+Теги для вывода уменьшенных копий изображений (см. drevo/thumbnails.py).
+
+Пример:
+{% load thumbnails %}
+<img {% thumbnail_srcset photo.photo 'photo' 150 %} height="150">
+"""
+from django import template
+from django.utils.html import format_html
+
+from ..thumbnails import DENSITIES, get_thumbnail_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(field_file, kind, size):
+    """
+    Возвращает адрес копии изображения field_file вида kind размера size.
+    """
+    return get_thumbnail_url(field_file, kind, int(size))
+
+
+@register.simple_tag
+def thumbnail_srcset(field_file, kind, size):
+    """
+    Выводит атрибуты src и srcset: копия размера size и копии
+    для экранов высокой плотности.
+    """
+    size = int(size)
+    urls = [(density, get_thumbnail_url(field_file, kind, size * density))
+            for density in DENSITIES]
+    srcset = ', '.join(f'{url} {density}x' for density, url in urls)
+    return format_html('src="{}" srcset="{}"', urls[0][1], srcset)
@@ -0,0 +1,143 @@
+"""
+Test of comment_threads functions
+
+
+Name of test classes:
+Test{Function or feature name}
+"""
+from django.template.loader import render_to_string
+from django.test import TestCase
+
+from .comment_threads import (get_comments_page, get_rendered_comments_page,
+                              invalidate_comments_cache)
+from .models import Comment, Tz, Znanie
+from users.models import User
+
+
+class CommentsTestData:
+    """
+    Общие данные: пять корневых комментариев знания, на последний из
+    которых есть ответ, а на ответ - вложенный ответ.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser',
+                                       email='test@test.test',
+                                       password='testpassword')
+        cls.knowledge = Znanie.objects.create(name='TestZnanie',
+                                              tz=Tz.objects.create(name='TestTz'),
+                                              user=cls.user,
+                                              is_published=True)
+        cls.roots = [cls.create_comment(f'root{i}') for i in range(5)]
+        cls.answer = cls.create_comment('answer', parent=cls.roots[-1])
+        cls.nested_answer = cls.create_comment('nested answer', parent=cls.answer)
+
+    @classmethod
+    def create_comment(cls, content, parent=None):
+        return Comment.objects.create(author=cls.user,
+                                      znanie=cls.knowledge,
+                                      parent=parent,
+                                      content=content)
+
+
+class TestCommentsPage(CommentsTestData, TestCase):
+
+    def test_keyset_pages(self):
+        comments, is_last_page = get_comments_page(self.knowledge, limit=3)
+        self.assertEqual(comments, self.roots[:1:-1])
+        self.assertFalse(is_last_page)
+        comments, is_last_page = get_comments_page(self.knowledge, comments[-1].pk, limit=3)
+        self.assertEqual(comments, self.roots[1::-1])
+        self.assertTrue(is_last_page)
+
+    def test_exact_last_page(self):
+        _, is_last_page = get_comments_page(self.knowledge, limit=5)
+        self.assertTrue(is_last_page)
+
+    def test_answers_are_loaded_in_one_query(self):
+        # корневые комментарии и ответы всех уровней
+        with self.assertNumQueries(2):
+            comments, _ = get_comments_page(self.knowledge, limit=3)
+            render_to_string('drevo/comments_list.html',
+                             {'comments': comments, 'offset': 3})
+        self.assertEqual(comments[0].get_answers(), [self.answer])
+        self.assertEqual(comments[0].get_answers()[0].get_answers(),
+                         [self.nested_answer])
+
+    def test_comment_page_view(self):
+        response = self.client.get(f'/drevo/znanie/{self.knowledge.pk}/comments/',
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertFalse(response.json()['is_last_page'])
+        self.assertIn('nested answer', response.json()['data'])
+
+
+class TestCommentThread(CommentsTestData, TestCase):
+
+    def assertThread(self, comment, root, depth, path, answers_count):
+        comment.refresh_from_db()
+        self.assertEqual((comment.root, comment.depth, comment.path, comment.answers_count),
+                         (root, depth, path, answers_count))
+
+    def test_thread_position(self):
+        root = self.roots[-1]
+        root_path = str(root.pk).zfill(Comment.PATH_STEP)
+        answer_path = root_path + str(self.answer.pk).zfill(Comment.PATH_STEP)
+        self.assertThread(root, root, 0, root_path, 1)
+        self.assertThread(self.answer, root, 1, answer_path, 1)
+        self.assertEqual(list(self.answer.get_thread().order_by('path')),
+                         [self.answer, self.nested_answer])
+
+    def test_delete_answer(self):
+        self.nested_answer.delete()
+        self.assertThread(self.answer, self.roots[-1], 1, self.answer.path, 0)
+
+    def test_queryset_delete_answer(self):
+        Comment.objects.filter(pk=self.nested_answer.pk).delete()
+        self.assertThread(self.answer, self.roots[-1], 1, self.answer.path, 0)
+
+    def test_save_keeps_answers_count(self):
+        stale = Comment.objects.get(pk=self.nested_answer.pk)
+        self.create_comment('another answer', parent=self.nested_answer)
+        stale.content = 'edited'
+        stale.save()
+        self.assertThread(stale, self.roots[-1], 2, self.nested_answer.path, 1)
+
+    def test_save_copy(self):
+        copy = Comment.objects.get(pk=self.roots[0].pk)
+        copy.pk = None
+        copy.save()
+        self.assertThread(copy, copy, 0, str(copy.pk).zfill(Comment.PATH_STEP), 0)
+
+    def test_rebuild_threads(self):
+        Comment.objects.update(root=None, depth=0, path='', answers_count=0)
+        Comment.rebuild_threads()
+        self.assertThread(self.nested_answer, self.roots[-1], 2,
+                          self.answer.path + str(self.nested_answer.pk).zfill(Comment.PATH_STEP), 0)
+        self.assertThread(self.answer, self.roots[-1], 1, self.answer.path, 1)
+
+
+class TestRenderedCommentsPage(CommentsTestData, TestCase):
+
+    def setUp(self):
+        invalidate_comments_cache(self.knowledge.pk)
+
+    def test_page_is_cached(self):
+        page = get_rendered_comments_page(self.knowledge)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_rendered_comments_page(self.knowledge), page)
+        self.assertNotEqual(get_rendered_comments_page(self.knowledge, is_authenticated=True),
+                            page)
+
+    def test_new_comment_resets_cache(self):
+        get_rendered_comments_page(self.knowledge)
+        self.create_comment('new comment')
+        data, _ = get_rendered_comments_page(self.knowledge)
+        self.assertIn('new comment', data)
+
+    def test_moderation_resets_cache(self):
+        get_rendered_comments_page(self.knowledge)
+        self.answer.unpublish()
+        self.answer.save()
+        data, _ = get_rendered_comments_page(self.knowledge)
+        self.assertIn('Комментарий удалён.', data)
@@ -0,0 +1,69 @@
+"""
+Test of the category tree page
+
+
+Name of test classes:
+Test{View name}
+"""
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import Category, Tz, Znanie
+from users.models import User
+
+
+class TestDrevoView(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser', password='testpassword')
+        cls.tz = Tz.objects.create(name='TestTz')
+        cls.root = Category.objects.create(name='Root', is_published=True)
+        cls.child = Category.objects.create(name='Child', parent=cls.root, is_published=True)
+        cls.empty = Category.objects.create(name='Empty', is_published=True)
+        Category.objects.create(name='Hidden', parent=cls.empty, is_published=False)
+        cls.knowledge = cls.create_knowledge('Knowledge', cls.child)
+        cls.create_knowledge('Unpublished', cls.child, is_published=False)
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def create_knowledge(cls, name, category, is_published=True):
+        return Znanie.objects.create(name=name, category=category, tz=cls.tz,
+                                     user=cls.user, is_published=is_published)
+
+    def test_tree(self):
+        resp = self.client.get(reverse('drevo'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['zn_dict'][self.child.pk], [self.knowledge])
+        flags = {node.name: node.has_published_subcategories for node in resp.context['ztypes']}
+        self.assertEqual(flags, {'Root': True, 'Child': False, 'Empty': False})
+        self.assertContains(resp, 'lonely', count=1)
+
+    def test_query_count_does_not_depend_on_tree_size(self):
+        self.client.get(reverse('drevo'))
+        for i in range(10):
+            category = Category.objects.create(name=f'Category{i}', parent=self.root,
+                                               is_published=True)
+            self.create_knowledge(f'Knowledge{i}', category)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('drevo'))
+
+    def test_tree_is_cached(self):
+        self.client.get(reverse('drevo'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('drevo'))
+
+    def test_changes_invalidate_cache(self):
+        self.client.get(reverse('drevo'))
+        self.knowledge.name = 'Renamed'
+        self.knowledge.save()
+        resp = self.client.get(reverse('drevo'))
+        self.assertEqual(resp.context['zn_dict'][self.child.pk][0].name, 'Renamed')
+
+        self.child.move_to(self.empty)
+        resp = self.client.get(reverse('drevo'))
+        flags = {node.name: node.has_published_subcategories for node in resp.context['ztypes']}
+        self.assertEqual(flags, {'Root': False, 'Child': False, 'Empty': True})
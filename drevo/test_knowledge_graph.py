@@ -0,0 +1,61 @@
+"""
+Test of the in-memory knowledge graph snapshot
+
+
+Name of test classes:
+Test{Class or feature name}
+"""
+from django.test import TestCase, override_settings
+
+from . import knowledge_graph
+from .knowledge_graph import get_knowledge_graph, invalidate_knowledge_graph
+from .models import Category, KnowledgeGraphVersion, Tr
+from .relations_tree import (get_ancestors_for_knowledge,
+                             get_category_for_knowledge,
+                             get_children_by_relation_type_for_knowledge,
+                             get_siblings_for_knowledge)
+from .test_relations_tree import RelationsTreeTestData
+
+
+@override_settings(KNOWLEDGE_GRAPH_SNAPSHOT=True, KNOWLEDGE_GRAPH_CHECK_INTERVAL=60)
+class TestKnowledgeGraph(RelationsTreeTestData, TestCase):
+
+    def setUp(self):
+        invalidate_knowledge_graph()
+
+    def test_same_answers_as_database(self):
+        other_tr = Tr.objects.create(name='OtherTr', order=1)
+        sibling = self.create_knowledge('sibling')
+        self.create_relation(self.first, sibling, tr=other_tr)
+        get_knowledge_graph()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_category_for_knowledge(self.third), self.category)
+            self.assertEqual(get_ancestors_for_knowledge(self.third),
+                             [self.base, self.first, self.second])
+            self.assertEqual(get_children_by_relation_type_for_knowledge(self.first),
+                             {self.tr: [self.second], other_tr: [sibling]})
+            self.assertEqual(get_siblings_for_knowledge(self.second), [sibling])
+
+    def test_changes_reload_snapshot(self):
+        get_knowledge_graph()
+        version = KnowledgeGraphVersion.get_version()
+        self.category.is_published = False
+        self.category.save()
+        self.assertGreater(KnowledgeGraphVersion.get_version(), version)
+        self.assertIsNone(get_category_for_knowledge(self.third))
+
+    def test_other_process_change_is_detected(self):
+        graph = get_knowledge_graph()
+        # изменение версии другим процессом
+        KnowledgeGraphVersion.objects.filter(pk=1).update(version=0)
+        with override_settings(KNOWLEDGE_GRAPH_CHECK_INTERVAL=0):
+            self.assertIsNot(get_knowledge_graph(), graph)
+
+    def test_new_knowledge_falls_back_to_database(self):
+        graph = get_knowledge_graph()
+        other_category = Category.objects.create(name='Other', is_published=True)
+        # снимок не перезагружается: знание создано другим процессом
+        knowledge = self.create_knowledge('new', category=other_category)
+        knowledge_graph._graph = graph
+        self.assertEqual(get_category_for_knowledge(knowledge), other_category)
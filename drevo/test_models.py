@@ -14,7 +14,9 @@ test_meta_{Meta class option}
 """
 
 from django.test import TestCase
-from .models import Znanie, Category, Tz, AuthorType, Author
+from django.urls import reverse
+from .models import (Znanie, Category, Tz, AuthorType, Author, Tr, Relation,
+                     ZnRating, Comment)
 from users.models import User
 
 class TestCategory(TestCase):
@@ -275,3 +277,167 @@ class TestZnanie(TestCase):
 
         
 
+
+
+class TestZnanieGetTableObject(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser', password='testpassword')
+        author = Author.objects.create(name='TestAuthor')
+        table_tz = Tz.objects.create(name='Таблица')
+        tz = Tz.objects.create(name='TestTz')
+        row_tr = Tr.objects.create(name='Строка')
+        col_tr = Tr.objects.create(name='Столбец')
+        value_tr = Tr.objects.create(name='Значение')
+        link_tr = Tr.objects.create(name='TestTr')
+
+        def create_knowledge(name, tz=tz, order=None):
+            return Znanie.objects.create(name=name, tz=tz, user=cls.user,
+                                         order=order, is_published=True)
+
+        def create_relation(bz, rz, tr):
+            return Relation.objects.create(bz=bz, rz=rz, tr=tr, author=author,
+                                           user=cls.user, is_published=True)
+
+        cls.table = create_knowledge('table', tz=table_tz)
+        rows = [create_knowledge(f'row{i}', order=i) for i in range(3)]
+        cols = [create_knowledge(f'col{i}', order=i) for i in range(3)]
+        for row in rows:
+            create_relation(cls.table, row, row_tr)
+        for col in cols:
+            create_relation(cls.table, col, col_tr)
+        cls.values = {}
+        for i, row in enumerate(rows):
+            for j, col in enumerate(cols):
+                if i == j:
+                    continue
+                value = create_knowledge(f'value{i}{j}')
+                create_relation(cls.table, value, value_tr)
+                create_relation(value, row, link_tr)
+                create_relation(value, col, link_tr)
+                cls.values[(i, j)] = value
+
+    def test_get_table_object(self):
+        table = Znanie.objects.get(pk=self.table.pk).get_table_object()
+        # строки и столбцы отсортированы по убыванию order
+        self.assertEqual([x.rz.name for x in table['rows']], ['row2', 'row1', 'row0'])
+        self.assertEqual([x.rz.name for x in table['cols']], ['col2', 'col1', 'col0'])
+        for i in range(3):
+            for j in range(3):
+                self.assertEqual(table['values'][2 - i][2 - j], self.values.get((i, j)))
+
+    def test_get_table_object_query_count(self):
+        knowledge = Znanie.objects.select_related('tz').get(pk=self.table.pk)
+        with self.assertNumQueries(4):
+            knowledge.get_table_object()
+
+
+class TestZnanieCounters(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser',
+                                       email='test@test.test',
+                                       password='testpassword')
+        cls.other_user = User.objects.create(username='OtherUser',
+                                             email='other@test.test',
+                                             password='testpassword')
+        cls.knowledge = Znanie.objects.create(name='TestZnanie',
+                                              tz=Tz.objects.create(name='TestTz'),
+                                              user=cls.user,
+                                              is_published=True)
+
+    def get_counters(self):
+        self.knowledge.refresh_from_db()
+        return (self.knowledge.get_likes_count(),
+                self.knowledge.get_dislikes_count(),
+                self.knowledge.get_comments_count())
+
+    def test_voting(self):
+        self.knowledge.voting(self.user, ZnRating.LIKE)
+        self.knowledge.voting(self.other_user, ZnRating.LIKE)
+        self.assertEqual(self.get_counters(), (2, 0, 0))
+        self.knowledge.voting(self.user, ZnRating.DISLIKE)
+        self.assertEqual(self.get_counters(), (1, 1, 0))
+        self.knowledge.voting(self.user, ZnRating.DISLIKE)
+        self.assertEqual(self.get_counters(), (1, 0, 0))
+
+    def test_comment_send_view(self):
+        self.client.force_login(self.user)
+        url = f'/drevo/znanie/{self.knowledge.pk}/comments/send/'
+        resp = self.client.get(url, {'content': 'Комментарий'},
+                               HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.get(url, {'content': 'Ответ', 'parent': resp.json()['new_comment_id']},
+                        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(self.get_counters(), (0, 0, 1))
+
+    def test_save_keeps_concurrent_counters(self):
+        stale = Znanie.objects.get(pk=self.knowledge.pk)
+        self.knowledge.voting(self.user, ZnRating.LIKE)
+        Znanie.objects.filter(pk=self.knowledge.pk).update(visits_count=3)
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(self.get_counters(), (1, 0, 0))
+        self.assertEqual((self.knowledge.name, self.knowledge.visits_count), ('Renamed', 3))
+
+    def test_save_copy_and_deleted(self):
+        self.knowledge.voting(self.user, ZnRating.LIKE)
+        self.knowledge.refresh_from_db()
+        copy = Znanie.objects.get(pk=self.knowledge.pk)
+        copy.pk = None
+        copy.name = 'Copy'
+        copy.save()
+        self.assertEqual(Znanie.objects.get(pk=copy.pk).likes_count, 1)
+        ZnRating.objects.all().delete()
+        Znanie.objects.filter(pk=copy.pk).delete()
+        copy.save()
+        self.assertEqual(Znanie.objects.get(pk=copy.pk).likes_count, 1)
+
+    def test_rating_edited_directly(self):
+        rating = ZnRating.objects.create(znanie=self.knowledge, user=self.user,
+                                         value=ZnRating.LIKE)
+        self.assertEqual(self.get_counters(), (1, 0, 0))
+        rating.value = ZnRating.DISLIKE
+        rating.save()
+        self.assertEqual(self.get_counters(), (0, 1, 0))
+        rating.delete()
+        self.assertEqual(self.get_counters(), (0, 0, 0))
+
+    def test_comment_unpublished_and_deleted(self):
+        comment = Comment.objects.create(author=self.user, znanie=self.knowledge,
+                                         content='Комментарий')
+        answer = Comment.objects.create(author=self.user, znanie=self.knowledge,
+                                        content='Ответ', parent=comment)
+        comment.refresh_from_db()
+        self.assertEqual(self.get_counters(), (0, 0, 1))
+        comment.unpublish()
+        comment.save()
+        # снятый с публикации комментарий выводится в списке как удаленный
+        # и учитывается в заголовке списка
+        self.assertEqual(self.get_counters(), (0, 0, 1))
+        resp = self.client.get(reverse('zdetail', args=[self.knowledge.pk]))
+        self.assertContains(resp, 'Комментарии (1)')
+        resp = self.client.get(f'/drevo/znanie/{self.knowledge.pk}/comments/',
+                               HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(resp.json()['data'].count('Комментарий удалён.'), 1)
+        answer.delete()
+        self.assertEqual(self.get_counters(), (0, 0, 1))
+        Comment.objects.filter(pk=comment.pk).delete()
+        self.assertEqual(self.get_counters(), (0, 0, 0))
+
+    def test_rebuild_counters(self):
+        self.knowledge.voting(self.user, ZnRating.LIKE)
+        Comment.objects.create(author=self.user, znanie=self.knowledge, content='Комментарий')
+        Znanie.objects.update(likes_count=0, comments_count=5)
+        Znanie.rebuild_counters()
+        self.assertEqual(self.get_counters(), (1, 0, 1))
+
+    def test_with_stats(self):
+        self.knowledge.voting(self.user, ZnRating.DISLIKE)
+        with self.assertNumQueries(1):
+            knowledge = Znanie.published.with_stats(user=self.user).get()
+            self.assertEqual(knowledge.user_vote, ZnRating.DISLIKE)
+            self.assertEqual(knowledge.dislikes_count, 1)
+        self.assertIsNone(Znanie.published.with_stats(user=self.other_user).get().user_vote)
+        self.assertIsNone(Znanie.published.with_stats().get().user_vote)
@@ -0,0 +1,118 @@
+"""
+Test of proof base grade computation
+
+
+Name of test classes:
+Test{Class name}
+"""
+from django.core.cache import cache
+from django.test import TestCase
+
+from .models import Author, Relation, Tr, Tz, Znanie
+from .models.knowledge_grade import KnowledgeGrade
+from .models.knowledge_grade_scale import KnowledgeGradeScale
+from .models.relation_grade import RelationGrade
+from .models.relation_grade_scale import RelationGradeScale
+from .proof_grades import ProofGradeSnapshot, get_cached_common_grades
+from users.models import User
+
+
+class ProofGradesTestData:
+    """
+    Общие данные: дерево доводов root <- a <- b и оценки пользователя.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser', password='testpassword')
+        cls.author = Author.objects.create(name='TestAuthor')
+        cls.tz = Tz.objects.create(name='TestTz', can_be_rated=True)
+        cls.tr = Tr.objects.create(name='TestTr', is_argument=True)
+        cls.high = KnowledgeGradeScale.objects.create(name='high', low_value=0.5, high_value=1)
+        cls.low = KnowledgeGradeScale.objects.create(name='low', low_value=0, high_value=0.5)
+        cls.strong = RelationGradeScale.objects.create(name='strong', value=1)
+
+        cls.root = cls.create_knowledge('root')
+        cls.a = cls.create_knowledge('a')
+        cls.b = cls.create_knowledge('b')
+        cls.root_a = cls.create_relation(cls.root, cls.a)
+        cls.create_relation(cls.a, cls.b)
+
+        KnowledgeGrade.objects.create(user=cls.user, knowledge=cls.a, grade=cls.low)
+        RelationGrade.objects.create(user=cls.user, relation=cls.root_a, grade=cls.strong)
+
+    @classmethod
+    def create_knowledge(cls, name):
+        return Znanie.objects.create(name=name, tz=cls.tz, user=cls.user, is_published=True)
+
+    @classmethod
+    def create_relation(cls, bz, rz):
+        return Relation.objects.create(bz=bz, rz=rz, tr=cls.tr, author=cls.author,
+                                       user=cls.user, is_published=True)
+
+
+class TestProofGradeSnapshot(ProofGradesTestData, TestCase):
+
+    def test_get_proof_base_grade(self):
+        snapshot = ProofGradeSnapshot(self.root, self.user)
+        # root: 0.25 (оценка a) * 1 (оценка связи) = 0.25
+        # a: 0.75 (оценка b по умолчанию) * 0.75 (оценка связи по умолчанию) = 0.5625
+        self.assertAlmostEqual(snapshot.get_proof_base_grade(), (0.25 + 0.5625) / 2)
+        self.assertAlmostEqual(snapshot.get_proof_base_grade(self.a.pk), 0.5625)
+        self.assertEqual(snapshot.get_proof_base_grade(self.b.pk), 0)
+
+    def test_get_common_grades(self):
+        snapshot = ProofGradeSnapshot(self.root, self.user)
+        common_grade_value, proof_base_value = snapshot.get_common_grades()
+        self.assertAlmostEqual(proof_base_value, 0.40625)
+        self.assertAlmostEqual(common_grade_value, (0.40625 + 0.75) / 2)
+
+    def test_query_count(self):
+        # один запрос на каждый уровень дерева, пустой последний уровень
+        # и три запроса на шкалу и оценки
+        with self.assertNumQueries(6):
+            ProofGradeSnapshot(self.root, self.user).get_proof_base_grade()
+
+    def test_cycle(self):
+        self.create_relation(self.b, self.root)
+        snapshot = ProofGradeSnapshot(self.root, self.user)
+        self.assertGreater(snapshot.get_proof_base_grade(), 0)
+
+    def test_cycle_result_does_not_depend_on_order(self):
+        self.create_relation(self.b, self.root)
+        snapshot = ProofGradeSnapshot(self.root, self.user)
+        snapshot.get_proof_base_grade()
+        # поддерево a, пройденное от root, обрезано циклом на root
+        self.assertAlmostEqual(snapshot.get_proof_base_grade(self.a.pk),
+                               ProofGradeSnapshot(self.root, self.user)
+                               .get_proof_base_grade(self.a.pk))
+
+
+class TestCachedCommonGrades(ProofGradesTestData, TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_result_is_reused(self):
+        grades = get_cached_common_grades(self.root, self.user, knowledge_ids=[self.a.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_cached_common_grades(self.root, self.user, knowledge_ids=[self.a.pk]),
+                grades)
+
+    def test_grade_change_invalidates_cache(self):
+        _, proof_base_value = get_cached_common_grades(self.root, self.user)[self.root.pk]
+        KnowledgeGrade.objects.filter(knowledge=self.a).update(grade=self.high)
+        # update() не вызывает сигналы, значение берется из кэша
+        self.assertEqual(get_cached_common_grades(self.root, self.user)[self.root.pk][1],
+                         proof_base_value)
+        KnowledgeGrade.objects.get(knowledge=self.a).save()
+        self.assertAlmostEqual(get_cached_common_grades(self.root, self.user)[self.root.pk][1],
+                               (0.75 + 0.5625) / 2)
+
+    def test_scale_change_invalidates_cache(self):
+        get_cached_common_grades(self.root, self.user)
+        self.strong.value = 0
+        self.strong.save()
+        self.assertAlmostEqual(get_cached_common_grades(self.root, self.user)[self.root.pk][1],
+                               0.5625)
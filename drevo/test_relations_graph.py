@@ -0,0 +1,51 @@
+"""
+Test of relations graph traversal
+
+
+Name of test classes:
+Test{Function or class name}
+"""
+from django.test import TestCase
+
+from .models import Tr
+from .relations_graph import UP, traverse
+from .test_relations_tree import RelationsTreeTestData
+
+
+class TestTraverse(RelationsTreeTestData, TestCase):
+
+    def test_one_query_per_level(self):
+        # три уровня связей и пустой четвертый фронт
+        with self.assertNumQueries(4):
+            graph = traverse([self.base.pk])
+        self.assertEqual(graph.depths, {self.base.pk: 0, self.first.pk: 1,
+                                        self.second.pk: 2, self.third.pk: 3})
+        self.assertEqual([r.rz for r in graph.get_children(self.first.pk)], [self.second])
+
+    def test_max_depth(self):
+        with self.assertNumQueries(2):
+            graph = traverse([self.base.pk], max_depth=2)
+        self.assertEqual(graph.knowledge_ids, {self.base.pk, self.first.pk, self.second.pk})
+
+    def test_up(self):
+        graph = traverse([self.third.pk], direction=UP)
+        self.assertEqual(list(graph.iter_bfs(direction=UP)),
+                         [self.third.pk, self.second.pk, self.first.pk, self.base.pk])
+
+    def test_filters(self):
+        systemic = Tr.objects.create(name='Systemic', is_systemic=True)
+        self.create_relation(self.base, self.create_knowledge('systemic'), tr=systemic)
+        hidden = self.create_knowledge('hidden')
+        hidden.is_published = False
+        hidden.save()
+        self.create_relation(self.base, hidden)
+
+        graph = traverse([self.base.pk], max_depth=1, is_published=True, is_systemic=False)
+        self.assertEqual(graph.knowledge_ids, {self.base.pk, self.first.pk})
+
+    def test_cycle(self):
+        self.create_relation(self.third, self.base)
+        graph = traverse([self.base.pk])
+        self.assertEqual(len(graph.relations), 4)
+        self.assertEqual(list(graph.iter_dfs()),
+                         [self.base.pk, self.first.pk, self.second.pk, self.third.pk])
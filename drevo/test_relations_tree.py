@@ -0,0 +1,218 @@
+"""
+Test of relations_tree functions
+
+
+Name of test classes:
+Test{Function or feature name}
+"""
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import (Author, Category, KnowledgeChain, Relation, Tr, Tz,
+                     Znanie)
+from .relations_tree import (get_ancestors_for_knowledge,
+                             get_categories_for_knowledges,
+                             get_category_for_knowledge,
+                             get_knowledges_by_categories,
+                             get_children_by_relation_type_for_knowledge,
+                             get_siblings_for_knowledge)
+from .sibling_index import invalidate_sibling_index
+from users.models import User
+
+
+class RelationsTreeTestData:
+    """
+    Общие данные: категория и цепочка знаний
+    base <- first <- second <- third, связанных через Relation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser',
+                                       email='test@test.test',
+                                       password='testpassword')
+        cls.author = Author.objects.create(name='TestAuthor')
+        cls.category = Category.objects.create(name='TestCategory',
+                                               is_published=True)
+        cls.tz = Tz.objects.create(name='TestTz')
+        cls.tr = Tr.objects.create(name='TestTr')
+        cls.base = cls.create_knowledge('base', category=cls.category)
+        cls.first = cls.create_knowledge('first')
+        cls.second = cls.create_knowledge('second')
+        cls.third = cls.create_knowledge('third')
+        cls.create_relation(cls.base, cls.first)
+        cls.create_relation(cls.first, cls.second)
+        cls.create_relation(cls.second, cls.third)
+
+    @classmethod
+    def create_knowledge(cls, name, category=None, tz=None, order=None):
+        return Znanie.objects.create(name=name,
+                                     category=category,
+                                     tz=tz or cls.tz,
+                                     user=cls.user,
+                                     order=order,
+                                     is_published=True)
+
+    @classmethod
+    def create_relation(cls, bz, rz, tr=None):
+        return Relation.objects.create(bz=bz,
+                                       rz=rz,
+                                       tr=tr or cls.tr,
+                                       author=cls.author,
+                                       user=cls.user,
+                                       is_published=True)
+
+
+class TestSiblings(RelationsTreeTestData, TestCase):
+
+    def setUp(self):
+        invalidate_sibling_index()
+
+    def test_category_siblings_in_order(self):
+        later = self.create_knowledge('later', category=self.category, order=2)
+        earlier = self.create_knowledge('earlier', category=self.category, order=1)
+        self.assertEqual(get_siblings_for_knowledge(later), [self.base, earlier])
+
+    def test_relation_siblings(self):
+        sibling = self.create_knowledge('sibling', order=1)
+        self.create_relation(self.first, sibling)
+        # повторная связь не дублирует знание
+        self.create_relation(self.first, sibling)
+        self.assertEqual(get_siblings_for_knowledge(self.second), [sibling])
+        self.assertIsNone(get_siblings_for_knowledge(self.create_knowledge('lonely')))
+
+    def test_window(self):
+        knowledges = [self.create_knowledge(f'k{order}', category=self.category, order=order)
+                      for order in range(1, 8)]
+        current = knowledges[3]
+        self.assertEqual(get_siblings_for_knowledge(current, window=2),
+                         knowledges[1:3] + knowledges[4:6])
+        self.assertEqual(get_siblings_for_knowledge(knowledges[-1], window=2),
+                         knowledges[4:6])
+
+    def test_group_is_cached_until_change(self):
+        get_siblings_for_knowledge(self.base)
+        knowledge = Znanie.objects.select_related('category').get(pk=self.base.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_siblings_for_knowledge(knowledge), [])
+        sibling = self.create_knowledge('sibling', category=self.category)
+        self.assertEqual(get_siblings_for_knowledge(self.base), [sibling])
+
+
+class TestKnowledgeChain(RelationsTreeTestData, TestCase):
+
+    def test_get_category_for_knowledge(self):
+        self.assertEqual(get_category_for_knowledge(self.base), self.category)
+        self.assertEqual(get_category_for_knowledge(self.third), self.category)
+
+    def test_get_ancestors_for_knowledge(self):
+        self.assertEqual(get_ancestors_for_knowledge(self.base), [])
+        self.assertEqual(get_ancestors_for_knowledge(self.third),
+                         [self.base, self.first, self.second])
+
+    def test_lookup_is_single_query(self):
+        get_category_for_knowledge(self.third)
+        with self.assertNumQueries(1):
+            get_category_for_knowledge(self.third)
+        with self.assertNumQueries(1):
+            get_ancestors_for_knowledge(self.third)
+
+    def test_unpublished_knowledge_breaks_chain(self):
+        get_category_for_knowledge(self.third)
+        self.first.is_published = False
+        self.first.save()
+        self.assertIsNone(get_category_for_knowledge(self.third))
+        self.assertEqual(get_ancestors_for_knowledge(self.third),
+                         [self.first, self.second])
+
+    def test_relation_change_invalidates_descendants(self):
+        get_category_for_knowledge(self.third)
+        other_category = Category.objects.create(name='OtherCategory',
+                                                 is_published=True)
+        other_base = self.create_knowledge('other base', category=other_category)
+        relation = Relation.objects.get(rz=self.first)
+        relation.bz = other_base
+        relation.save()
+        self.assertEqual(get_category_for_knowledge(self.third), other_category)
+        self.assertEqual(get_ancestors_for_knowledge(self.third),
+                         [other_base, self.first, self.second])
+
+    def test_cycle_does_not_loop(self):
+        loop_a = self.create_knowledge('loop a')
+        loop_b = self.create_knowledge('loop b')
+        self.create_relation(loop_a, loop_b)
+        self.create_relation(loop_b, loop_a)
+        self.assertIsNone(get_category_for_knowledge(loop_a))
+        self.assertEqual(get_ancestors_for_knowledge(loop_a), [loop_b])
+        self.assertTrue(KnowledgeChain.objects.filter(knowledge=loop_a).exists())
+
+
+class TestChildrenByRelationType(RelationsTreeTestData, TestCase):
+
+    def test_grouping_and_order(self):
+        second_tr = Tr.objects.create(name='SecondTr', order=2)
+        first_tr = Tr.objects.create(name='FirstTr', order=1)
+        late = self.create_knowledge('late', order=2)
+        early = self.create_knowledge('early', order=1)
+        other = self.create_knowledge('other')
+        self.create_relation(self.base, late, tr=first_tr)
+        self.create_relation(self.base, early, tr=first_tr)
+        self.create_relation(self.base, other, tr=second_tr)
+
+        children = get_children_by_relation_type_for_knowledge(self.base)
+
+        self.assertEqual(list(children.keys()), [self.tr, first_tr, second_tr])
+        self.assertEqual(children[first_tr], [early, late])
+        self.assertEqual(children[self.tr], [self.first])
+
+    def test_query_count_does_not_depend_on_children_number(self):
+        for i in range(20):
+            tr = Tr.objects.create(name=f'Tr{i}', order=i)
+            self.create_relation(self.first, self.create_knowledge(f'child{i}'), tr=tr)
+
+        with self.assertNumQueries(1):
+            children = get_children_by_relation_type_for_knowledge(self.first)
+            for relation_type, knowledges in children.items():
+                for child in knowledges:
+                    str(child.tz), str(child.author)
+
+        self.assertEqual(len(children), 21)
+
+
+class TestKnowledgesByCategories(RelationsTreeTestData, TestCase):
+
+    def test_get_categories_for_knowledges(self):
+        orphan = self.create_knowledge('orphan')
+        knowledges = [self.base, self.first, self.second, self.third, orphan]
+        # по запросу на каждый уровень самой длинной цепочки, плюс
+        # чтение готовых цепочек, загрузка знаний и запись цепочек
+        with self.assertNumQueries(10):
+            categories = get_categories_for_knowledges(knowledges)
+        self.assertEqual(categories, {self.base.pk: self.category,
+                                      self.first.pk: self.category,
+                                      self.second.pk: self.category,
+                                      self.third.pk: self.category,
+                                      orphan.pk: None})
+        self.assertEqual(get_ancestors_for_knowledge(self.third),
+                         [self.base, self.first, self.second])
+        with self.assertNumQueries(1):
+            self.assertEqual(get_categories_for_knowledges(knowledges), categories)
+
+    def test_get_knowledges_by_categories(self):
+        orphan = self.create_knowledge('orphan')
+        categories, knowledges = get_knowledges_by_categories(
+            Znanie.published.order_by('pk'))
+        self.assertEqual(categories, [self.category])
+        self.assertEqual(knowledges[self.category.pk],
+                         {'base': [self.base],
+                          'additional': [self.first, self.second, self.third]})
+        self.assertEqual(knowledges[None], {'base': [], 'additional': [orphan]})
+
+    def test_author_detail_view(self):
+        for knowledge in (self.base, self.first):
+            knowledge.author = self.author
+            knowledge.save()
+        resp = self.client.get(reverse('author', args=[self.author.pk]))
+        self.assertContains(resp, self.category.name)
+        self.assertContains(resp, 'first')
+        self.assertNotContains(resp, 'Знания, не имеющие категории')
@@ -0,0 +1,199 @@
+"""
+Test of search
+
+
+Name of test classes:
+Test{Function or view name}
+"""
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import Author, Category, Label, Tz, Znanie
+from .search_cache import get_cached_search_results, normalize_parameters
+from .search_index import get_terms, normalize_word, search_knowledges
+from .views.search_engine import SearchEngineMixin
+from users.models import User
+
+
+class SearchTestData:
+    """
+    Общие данные: несколько опубликованных знаний с разным текстом.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser', password='testpassword')
+        cls.author = Author.objects.create(name='Иван Петров')
+        cls.category = Category.objects.create(name='Философия', is_published=True)
+        cls.tz = Tz.objects.create(name='Тезис')
+        cls.both = cls.create_knowledge('Древо знания',
+                                        content='<p>Граф <b>знаний</b> о мире</p>')
+        cls.tree = cls.create_knowledge('Зеленое дерево',
+                                        content='Дерево растет в лесу')
+        cls.knowledge = cls.create_knowledge('Теория познания',
+                                             source_com='Знание и опыт')
+        cls.hidden = cls.create_knowledge('Скрытое знание', is_published=False)
+
+    @classmethod
+    def create_knowledge(cls, name, content=None, source_com=None, is_published=True):
+        return Znanie.objects.create(name=name,
+                                     content=content,
+                                     source_com=source_com,
+                                     tz=cls.tz,
+                                     category=cls.category,
+                                     author=cls.author,
+                                     user=cls.user,
+                                     is_published=is_published)
+
+
+class TestSearchKnowledges(SearchTestData, TestCase):
+
+    def test_get_terms_strips_html(self):
+        self.assertNotIn('p', get_terms('<p>Граф</p>'))
+
+    def test_normalize_word(self):
+        self.assertEqual(normalize_word('Знания'), normalize_word('знаний'))
+        self.assertEqual(normalize_word('ЁЖИК'), normalize_word('ежик'))
+        self.assertIsNone(normalize_word('И'))
+
+    def test_stop_words_are_ignored(self):
+        self.assertEqual(get_terms('дерево и лес'), get_terms('дерево лес'))
+
+    def test_word_forms_match(self):
+        found = list(search_knowledges(Znanie.published.all(), 'деревья'))
+        self.assertEqual(found, [self.tree])
+
+    def test_more_matched_words_first(self):
+        found = list(search_knowledges(Znanie.published.all(), 'граф знаний'))
+        self.assertEqual(found[0], self.both)
+        self.assertEqual(found[0].search_rank, 2)
+        self.assertIn(self.knowledge, found)
+        self.assertNotIn(self.tree, found)
+        self.assertNotIn(self.hidden, found)
+
+    def test_index_follows_changes(self):
+        self.tree.content = 'Граф связей'
+        self.tree.save()
+        self.assertIn(self.tree, search_knowledges(Znanie.published.all(), 'граф'))
+
+    def test_page_is_loaded_lazily(self):
+        results = search_knowledges(Znanie.published.all(), 'граф знаний мира')
+        with self.assertNumQueries(1):
+            self.assertEqual(results.count(), 2)
+        # id знаний страницы и сами знания
+        with self.assertNumQueries(2):
+            self.assertEqual(results[:1], [self.both])
+        self.assertEqual(results[1], self.knowledge)
+        with self.assertRaises(IndexError):
+            results[2]
+
+
+class TestKnowledgeSearchView(SearchTestData, TestCase):
+
+    def test_main_search(self):
+        resp = self.client.get(reverse('search_knowledge'), {'main_search': 'Граф знаний'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.context['page_obj'])[0], self.both)
+
+
+class TestLowerLookup(SearchTestData, TestCase):
+
+    def test_cyrillic_case_insensitive(self):
+        self.assertEqual(list(Znanie.objects.filter(name__lower__contains='дерево')),
+                         [self.tree])
+        self.assertEqual(list(Author.objects.filter(name__lower='иван петров')),
+                         [self.author])
+
+    @skipUnless(connection.vendor == 'sqlite', 'план запроса SQLite')
+    def test_lower_lookup_uses_index(self):
+        self.assertIn('drevo_label_name_lower',
+                      Label.objects.filter(name__lower='граф').explain())
+
+    def test_builtin_lower_is_not_replaced(self):
+        # встроенной LOWER пользуются другие клиенты базы
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT LOWER('ABC Дерево')")
+            expected = 'abc дерево' if connection.vendor != 'sqlite' else 'abc Дерево'
+            self.assertEqual(cursor.fetchone()[0], expected)
+
+
+class TestTagSearchView(SearchTestData, TestCase):
+
+    def test_more_matched_words_first(self):
+        graph = Label.objects.create(name='Граф')
+        graph_knowledge = Label.objects.create(name='ГРАФ ЗНАНИЙ')
+        Label.objects.create(name='Без знаний')
+        self.both.labels.add(graph, graph_knowledge)
+        resp = self.client.get(reverse('search_tag'), {'main_search': 'граф знаний'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.context['page_obj']), [graph_knowledge, graph])
+
+    def test_exact_tag_names(self):
+        philosophy = Label.objects.create(name='Philosophy')
+        tree = Label.objects.create(name='Ёлка')
+        conjunction = Label.objects.create(name='и')
+        self.both.labels.add(philosophy, tree, conjunction)
+        for query, label in (('Philosophy', philosophy),
+                             ('ёлка', tree),
+                             ('И', conjunction)):
+            resp = self.client.get(reverse('search_tag'), {'main_search': query})
+            self.assertIn(label, resp.context['page_obj'])
+
+    def test_search_words(self):
+        self.assertEqual(SearchEngineMixin().get_search_words('Знания и, знания!'),
+                         ['знания', 'и'])
+
+
+class TestSearchCache(SearchTestData, TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, **params):
+        resp = self.client.get(reverse('search_knowledge'), params)
+        return list(resp.context['page_obj'])
+
+    def test_normalize_parameters(self):
+        self.assertEqual(normalize_parameters('page=&main_search=%D0%93%D1%80%D0%B0%D1%84&author=x'),
+                         normalize_parameters('author=X&main_search=%D0%B3%D1%80%D0%B0%D1%84'))
+
+    def test_cached_ids_are_reused(self):
+        self.search(main_search='граф')
+        # запись в индекс без сохранения знания не сбрасывает кэш
+        self.tree.search_terms.create(term='граф')
+        self.assertNotIn(self.tree, self.search(main_search='Граф'))
+
+    def test_knowledge_change_invalidates_cache(self):
+        self.search(main_search='граф')
+        self.tree.content = 'Граф'
+        self.tree.save()
+        self.assertIn(self.tree, self.search(main_search='граф'))
+
+    def test_category_change_invalidates_cache(self):
+        self.assertEqual(self.search(knowledge_category='другая'), [])
+        self.category.name = 'Другая'
+        self.category.save()
+        self.assertNotEqual(self.search(knowledge_category='другая'), [])
+
+    def test_only_first_ids_are_cached(self):
+        knowledges = Znanie.objects.order_by('pk')
+        ids = list(knowledges.values_list('pk', flat=True))
+        with mock.patch('drevo.search_cache.CACHED_IDS_LIMIT', 2):
+            results = get_cached_search_results('test', '', knowledges)
+            self.assertEqual(results.ids.head, ids[:2])
+            self.assertEqual(results.count(), len(ids))
+            with self.assertNumQueries(1):
+                self.assertEqual([x.pk for x in results[:2]], ids[:2])
+            self.assertEqual([x.pk for x in results[1:]], ids[1:])
+
+    def test_author_change_invalidates_cache(self):
+        resp = self.client.get(reverse('search_author'), {'main_search': 'иван'})
+        self.assertEqual(list(resp.context['page_obj']), [self.author])
+        self.author.name = 'Петр Сидоров'
+        self.author.save()
+        resp = self.client.get(reverse('search_author'), {'main_search': 'иван'})
+        self.assertEqual(list(resp.context['page_obj']), [])
@@ -0,0 +1,97 @@
+"""
+Test of thumbnails functions and template tags
+
+
+Name of test classes:
+Test{Function or feature name}
+"""
+import io
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .models import Tz, ZnImage, Znanie
+from .thumbnails import PHOTO, get_thumbnail_name, make_thumbnail
+from users.models import User
+
+
+def create_image_file(name, size):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class TestThumbnails(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create(username='TestUser',
+                                        email='test@test.test',
+                                        password='testpassword')
+        self.knowledge = Znanie.objects.create(name='TestZnanie',
+                                               tz=Tz.objects.create(name='TestTz'),
+                                               user=self.user)
+        self.image = ZnImage.objects.create(znanie=self.knowledge,
+                                            photo=create_image_file('photo.png', (800, 600)))
+
+    def open_thumbnail(self, field_file, size):
+        return Image.open(default_storage.open(get_thumbnail_name(field_file.name, size)))
+
+    def test_thumbnails_are_created_on_upload(self):
+        self.assertEqual(self.open_thumbnail(self.image.photo, 150).size, (200, 150))
+        self.assertEqual(self.open_thumbnail(self.image.photo, 300).size, (400, 300))
+
+    def test_avatar_is_cropped_to_square(self):
+        profile = self.user.profile
+        profile.avatar = create_image_file('avatar.png', (300, 200))
+        profile.save()
+        self.assertEqual(self.open_thumbnail(profile.avatar, 64).size, (64, 64))
+        # изображение не увеличивается
+        self.assertEqual(self.open_thumbnail(profile.avatar, 400).size, (200, 200))
+
+    def test_srcset_tag(self):
+        html = Template("{% load thumbnails %}{% thumbnail_srcset image 'photo' 100 %}").render(
+            Context({'image': self.image.photo}))
+        url_1x = default_storage.url(get_thumbnail_name(self.image.photo.name, 100))
+        url_2x = default_storage.url(get_thumbnail_name(self.image.photo.name, 200))
+        self.assertEqual(html, f'src="{url_1x}" srcset="{url_1x} 1x, {url_2x} 2x"')
+        # копия создана при первом обращении
+        self.assertEqual(self.open_thumbnail(self.image.photo, 100).size, (133, 100))
+
+    def test_make_thumbnails_command(self):
+        name = make_thumbnail(self.image.photo, PHOTO, 150)
+        default_storage.delete(name)
+        call_command('make_thumbnails', stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(name))
+
+    def test_thumbnails_of_different_formats(self):
+        self.assertNotEqual(get_thumbnail_name('photos/image.jpg', 150),
+                            get_thumbnail_name('photos/image.png', 150))
+
+    def test_thumbnails_are_deleted(self):
+        old_name = get_thumbnail_name(self.image.photo.name, 150)
+        self.image.photo = create_image_file('other.png', (800, 600))
+        self.image.save()
+        self.assertFalse(default_storage.exists(old_name))
+        name = get_thumbnail_name(self.image.photo.name, 150)
+        self.assertTrue(default_storage.exists(name))
+        self.image.delete()
+        self.assertFalse(default_storage.exists(name))
@@ -0,0 +1,100 @@
+"""
+Test of visit tracking
+
+
+Name of test classes:
+Test{Function or view name}
+"""
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import visit_tracking
+from .models import IP, Tz, Visits, Znanie
+from .visit_tracking import Visit, flush_visits, write_visits
+from users.models import User
+
+
+class VisitTrackingTestData:
+    """
+    Общие данные: пользователь и два опубликованных знания.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='TestUser', password='testpassword')
+        cls.tz = Tz.objects.create(name='TestTz')
+        cls.first = Znanie.objects.create(name='first', tz=cls.tz, user=cls.user,
+                                          is_published=True)
+        cls.second = Znanie.objects.create(name='second', tz=cls.tz, user=cls.user,
+                                           is_published=True)
+
+
+class TestWriteVisits(VisitTrackingTestData, TestCase):
+
+    def test_duplicates_are_skipped(self):
+        write_visits([Visit(self.first.pk, '10.0.0.1', None),
+                      Visit(self.first.pk, '10.0.0.1', None),
+                      Visit(self.second.pk, '10.0.0.1', None),
+                      Visit(self.first.pk, None, self.user.pk)])
+        write_visits([Visit(self.first.pk, '10.0.0.1', None),
+                      Visit(self.first.pk, None, self.user.pk)])
+
+        self.assertEqual(IP.objects.count(), 1)
+        self.assertEqual(set(IP.objects.get().visits.all()), {self.first, self.second})
+        self.assertEqual(Visits.objects.filter(user=self.user).count(), 1)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.visits_count, self.second.visits_count), (2, 1))
+
+    def test_rebuild_visits_counts(self):
+        write_visits([Visit(self.first.pk, '10.0.0.1', None),
+                      Visit(self.first.pk, None, self.user.pk)])
+        Znanie.objects.update(visits_count=0)
+        call_command('rebuild_visits_counts', stdout=io.StringIO())
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.visits_count, self.second.visits_count), (2, 0))
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        visits = [Visit(knowledge.pk, f'10.0.0.{i}', None)
+                  for i in range(20) for knowledge in (self.first, self.second)]
+        # адреса: вставка с пропуском существующих и чтение;
+        # просмотры: поиск и создание; счетчики: обновление;
+        # точка сохранения транзакции
+        with self.assertNumQueries(7):
+            write_visits(visits)
+
+    def test_addresses_are_packed(self):
+        write_visits([Visit(self.first.pk, '10.0.0.1', None),
+                      Visit(self.second.pk, '::ffff:10.0.0.1', None),
+                      Visit(self.first.pk, '2001:db8::1', None),
+                      Visit(self.first.pk, 'unknown', None)])
+        self.assertEqual(sorted(ip.address for ip in IP.objects.all()),
+                         ['10.0.0.1', '2001:db8::1'])
+        self.assertEqual(len(IP.objects.get(ip=IP.pack('10.0.0.1')).ip), 4)
+
+    def test_flush_visits(self):
+        visit_tracking._queue.put(Visit(self.first.pk, None, self.user.pk))
+        flush_visits()
+        self.assertTrue(Visits.objects.filter(user=self.user, znanie=self.first).exists())
+
+
+@override_settings(VISITS_ASYNC=False)
+class TestZnanieDetailView(VisitTrackingTestData, TestCase):
+
+    def test_anonymous_visit(self):
+        self.client.get(reverse('zdetail', args=[self.first.pk]),
+                        HTTP_X_FORWARDED_FOR='10.0.0.2, 10.0.0.3')
+        self.assertEqual(list(IP.objects.get(ip=IP.pack('10.0.0.2')).visits.all()), [self.first])
+
+    def test_user_visit(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('zdetail', args=[self.first.pk]))
+        self.client.get(reverse('zdetail', args=[self.first.pk]))
+        self.assertEqual(Visits.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(IP.objects.exists())
+        resp = self.client.get(reverse('zdetail', args=[self.first.pk]))
+        self.assertEqual(resp.context['visits'], 1)
@@ -0,0 +1,155 @@
+"""
+Уменьшенные копии изображений (фото знаний ZnImage.photo и аватары
+пользователей Profile.avatar).
+
+Копии хранятся рядом с оригиналом в подкаталоге THUMBNAILS_DIR:
+photos/2021/01/01/image.jpg -> photos/2021/01/01/thumbnails/image.jpg_150.webp
+(имя оригинала сохраняется полностью, чтобы копии image.jpg и image.png
+не совпадали).
+Размер копии задается в пикселях: для фото - высота (ширина
+пропорциональна), аватары обрезаются до квадрата.
+
+Копии размеров SIZES (и удвоенных для экранов высокой плотности)
+создаются при сохранении записи (см. drevo/signals.py) и командой
+make_thumbnails для уже загруженных изображений. Копия другого размера
+создается при первом обращении к ней из шаблона (см. templatetags/thumbnails.py)
+и далее берется с диска. При замене или удалении изображения его копии
+удаляются (см. drevo/signals.py).
+"""
+import io
+import os
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from loguru import logger
+from PIL import Image, ImageOps, features
+
+# Виды изображений
+PHOTO = 'photo'
+AVATAR = 'avatar'
+
+# Размеры, в которых изображения выводятся на страницах, пикс.
+SIZES = {
+    PHOTO: (150,),
+    AVATAR: (32, 200),
+}
+# Плотности экранов, для которых создаются копии
+DENSITIES = (1, 2)
+
+THUMBNAILS_DIR = 'thumbnails'
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def get_format():
+    """
+    Возвращает формат копий: THUMBNAIL_FORMAT из настроек проекта,
+    JPEG - если Pillow собран без поддержки WebP.
+    """
+    thumbnail_format = getattr(settings, 'THUMBNAIL_FORMAT', 'WEBP').upper()
+    if thumbnail_format == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return thumbnail_format
+
+
+def get_thumbnail_name(name, size):
+    directory, filename = os.path.split(name)
+    extension = 'jpg' if get_format() == 'JPEG' else get_format().lower()
+    return os.path.join(directory, THUMBNAILS_DIR, f'{filename}_{size}.{extension}')
+
+
+def delete_thumbnails(name, storage):
+    """
+    Удаляет все копии изображения name из хранилища storage.
+    Возвращает число удаленных копий.
+    """
+    directory, filename = os.path.split(name)
+    thumbnails_dir = os.path.join(directory, THUMBNAILS_DIR)
+    # размер и, возможно, суффикс, добавленный хранилищем к занятому имени
+    thumbnail_re = re.compile(re.escape(filename) + r'_\d+(_[a-zA-Z0-9]{7})?\.[a-z]+')
+    try:
+        _, files = storage.listdir(thumbnails_dir)
+    except FileNotFoundError:
+        return 0
+    count = 0
+    for thumbnail in files:
+        if thumbnail_re.fullmatch(thumbnail):
+            storage.delete(os.path.join(thumbnails_dir, thumbnail))
+            count += 1
+    return count
+
+
+def resize(image, kind, size):
+    """
+    Возвращает копию изображения размера size для вида kind.
+    Изображение не увеличивается.
+    """
+    image = ImageOps.exif_transpose(image)
+    if kind == AVATAR:
+        size = min(size, *image.size)
+        return ImageOps.fit(image, (size, size), Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail((image.width, min(size, image.height)), Image.LANCZOS)
+    return image
+
+
+def encode(image):
+    buffer = io.BytesIO()
+    if get_format() == 'JPEG':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        image.save(buffer, get_format(), quality=WEBP_QUALITY)
+    return buffer.getvalue()
+
+
+def make_thumbnail(field_file, kind, size, force=False):
+    """
+    Создает копию изображения field_file размера size, если ее нет
+    (при force=True - заново). Возвращает имя копии в хранилище.
+    """
+    storage = field_file.storage
+    name = get_thumbnail_name(field_file.name, size)
+    if force or not storage.exists(name):
+        if force:
+            storage.delete(name)
+        with storage.open(field_file.name) as file, Image.open(file) as image:
+            data = encode(resize(image, kind, size))
+        # если копию одновременно создал другой процесс, хранилище
+        # сохранит эту копию под другим именем; она лишняя и удаляется,
+        # а используется копия под основным именем
+        saved_name = storage.save(name, ContentFile(data))
+        if saved_name != name:
+            storage.delete(saved_name)
+    return name
+
+
+def make_thumbnails(field_file, kind, force=False):
+    """
+    Создает копии изображения всех размеров SIZES вида kind.
+    Возвращает число созданных или проверенных копий.
+    """
+    count = 0
+    for size in SIZES[kind]:
+        for density in DENSITIES:
+            make_thumbnail(field_file, kind, size * density, force=force)
+            count += 1
+    return count
+
+
+def get_thumbnail_url(field_file, kind, size):
+    """
+    Возвращает адрес копии изображения размера size, создавая ее
+    при необходимости. Если копию создать не удалось, возвращается
+    адрес оригинала.
+    """
+    try:
+        name = make_thumbnail(field_file, kind, size)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception(f'Не удалось создать копию изображения {field_file.name}')
+        return field_file.url
+    return field_file.storage.url(name)
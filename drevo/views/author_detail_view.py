@@ -28,7 +28,7 @@ class AuthorDetailView(DetailView):
 
         # получаем знания данного автора
         knowledges_of_author = Znanie.published.filter(
-            author__id=int(self.kwargs['pk']))
+            author__id=int(self.kwargs['pk'])).with_stats(user=self.request.user)
 
         context['categories'], context['knowledges'] = \
             get_knowledges_by_categories(knowledges_of_author)
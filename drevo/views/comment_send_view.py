@@ -32,6 +32,8 @@ class CommentSendView(ProcessFormView):
                 parent_comment = None
                 if parent_id:
                     parent_comment = get_object_or_404(Comment, id=parent_id)
+                    if parent_comment.depth >= Comment.MAX_DEPTH:
+                        raise Http404
 
                 new_comment = Comment.objects.create(
                     author=author,
@@ -45,7 +47,7 @@ class CommentSendView(ProcessFormView):
                 }
 
                 is_first_answer = True
-                if parent_id and parent_comment.answers.count() > 1:
+                if parent_id and parent_comment.answers_count > 0:
                     is_first_answer = False
 
                 if parent_id and not is_first_answer:
@@ -21,8 +21,10 @@ class DrevoListView(ListView):
         формирует выборку из сущностей Знание для вывода
         """
         category_pk = self.kwargs['pk']
-        qs = Znanie.published.filter(
-            category__pk=category_pk).order_by('-order')
+        qs = (Znanie.published
+              .filter(category__pk=category_pk)
+              .order_by('-order')
+              .with_stats(user=self.request.user))
         return qs
 
     def get_context_data(self, *, object_list=None, **kwargs):
@@ -1,6 +1,5 @@
 from django.views.generic import TemplateView
-from ..models import Category, Znanie
-from ..models import Category, Znanie
+from ..category_tree import get_category_tree
 from loguru import logger
 
 
@@ -19,17 +18,5 @@ class DrevoView(TemplateView):
         Передает данные в шаблон
         """
         context = super().get_context_data(**kwargs)
-        # формирует список категорий
-        categories = Category.tree_objects.exclude(is_published=False)
-        context['ztypes'] = categories
-
-        # формирование списка Знаний по категориям
-        zn = Znanie.published.all()
-        zn_dict = {}
-        for category in categories:
-            zn_in_this_category = zn.filter(
-                category=category).order_by('-order')
-            zn_dict[category.name] = zn_in_this_category
-        context['zn_dict'] = zn_dict
-
-        return context
\ No newline at end of file
+        context['ztypes'], context['zn_dict'] = get_category_tree()
+        return context
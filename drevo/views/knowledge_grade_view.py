@@ -5,6 +5,7 @@ from drevo.models.knowledge_grade_scale import KnowledgeGradeScale
 from drevo.models.knowledge import Znanie
 from drevo.models.relation_grade import RelationGrade
 from drevo.models.relation_grade_scale import RelationGradeScale
+from drevo.proof_grades import get_cached_common_grades
 from django.shortcuts import HttpResponseRedirect, Http404, get_object_or_404
 from django.views.decorators.csrf import csrf_protect
 from django.utils.decorators import method_decorator
@@ -37,14 +38,23 @@ class KnowledgeFormView(TemplateView):
 
             knowledge = Znanie.objects.get(id=self.kwargs.get('pk'))
             context['knowledge'] = knowledge
-            context['proof_relations'] = knowledge.base.filter(
-                tr__is_argument=True,
-                rz__tz__can_be_rated=True,
-            )
             context['knowledge_scale'] = KnowledgeGradeScale.objects.all()
             context['relation_scale'] = RelationGradeScale.objects.all()
 
-            common_grade_value, proof_base_value = knowledge.get_common_grades(request=self.request)
+            # оценки всего дерева доводов берутся из кэша или считаются по одному снимку
+            proof_relations = list(knowledge.base.filter(
+                tr__is_argument=True,
+                rz__tz__can_be_rated=True,
+            ).select_related('tr', 'rz'))
+            grades = get_cached_common_grades(
+                knowledge, user,
+                variant=Znanie.get_grade_variant(self.request),
+                knowledge_ids=[relation.rz_id for relation in proof_relations])
+            for relation in proof_relations:
+                relation.common_grades = grades[relation.rz_id]
+            context['proof_relations'] = proof_relations
+
+            common_grade_value, proof_base_value = grades[knowledge.pk]
             if not proof_base_value:
                 proof_base_value = KnowledgeGradeScale.objects.all().first().get_base_grade()
             context['proof_base_value'] = proof_base_value
@@ -67,6 +67,8 @@ class AuthorSearchView(FormView, SearchEngineMixin):
 
             authors = authors.order_by('name').select_related('atype')
 
+            authors = self.get_cached_results(authors)
+
             paginator = Paginator(authors, 10)
 
             cur_page_number = self.request.GET.get('page')
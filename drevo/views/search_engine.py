@@ -2,7 +2,8 @@ import urllib
 from ..models import *
 from django.db.models import (Q,
                               QuerySet)
-from itertools import permutations, combinations
+from ..search_cache import get_cached_search_results
+from ..search_index import WORD_RE
 
 
 class SearchEngineMixin:
@@ -32,23 +33,9 @@ class SearchEngineMixin:
             fields_name = [fields_name]
 
         result_query = Q()
-        # Так как sqlite не может искать без учета регистра,
-        # будем искать и с заглавной буквы и с маленькой
+        # Сравниваем значения в нижнем регистре (см. drevo/lookups.py)
         for field_name in fields_name:
-            query = Q(**{field_name + lookup: parameter_value})
-
-            if not parameter_value.istitle():
-                query = query.__or__(Q(
-                    **{field_name + lookup: parameter_value.capitalize()}))
-
-            query_upper = Q(
-                **{field_name + lookup: parameter_value.upper()})
-
-            query_lower = Q(
-                **{field_name + lookup: parameter_value.lower()})
-
-            query = (query.__or__(query_upper)
-                     .__or__(query_lower))
+            query = Q(**{field_name + '__lower' + lookup: parameter_value.lower()})
 
             if connector == 'AND':
                 result_query = result_query.__and__(query)
@@ -58,31 +45,21 @@ class SearchEngineMixin:
                 raise Exception(f'Некорректный коннектор {connector}')
         return result_query
 
-    def get_parameter_combinations(self, main_search_parameter: str):
-        parameters = main_search_parameter.split()
-        parameters = [self.cut_ending_word(par) for par in parameters]
-        parameter_combinations = []
-        for num_elements in range(len(parameters), 0, -1):
-            for combination in combinations(parameters, num_elements):
-
-                parameter_combinations.append(combination)
-        return parameter_combinations
-
-    def cut_ending_word(self, value):
-        vowels = ['а', 'е', 'ё', 'и', 'й', 'о', 'у', 'ы', 'э', 'ю' 'я']
-        vowels = vowels + [char.capitalize() for char in vowels]
-        if vowels[-1] not in vowels:
-            return value
-
-        if len(value) <= 3:
-            return value
-
-        result = []
-
-        cut_off_the_end = False
-        for char in reversed(value):
-            if cut_off_the_end or char not in vowels:
-                cut_off_the_end = True
-                result.append(char)
-        value = ''.join(reversed(result))
-        return value
+    def get_cached_results(self, results):
+        """
+        Возвращает результаты поиска по закэшированному списку id,
+        ключ кэша строится по параметрам запроса без номера страницы.
+        """
+        return get_cached_search_results(
+            self.__class__.__name__,
+            self.get_parameters_string(exclude_params=['page']),
+            results)
+
+    def get_search_words(self, main_search_parameter: str):
+        """
+        Возвращает слова запроса в нижнем регистре без повторов.
+        Слова сравниваются с названиями тегов (name__lower), которые
+        не нормализуются, поэтому стемминг и стоп-слова здесь не применяются.
+        """
+        words = (word.lower() for word in WORD_RE.findall(main_search_parameter))
+        return list(dict.fromkeys(words))
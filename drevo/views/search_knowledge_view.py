@@ -8,6 +8,7 @@ from django.db.models import (Q,
                               QuerySet,
                               Count)
 from .search_engine import SearchEngineMixin
+from ..search_index import search_knowledges
 from django.forms import formset_factory
 
 
@@ -26,7 +27,8 @@ class KnowledgeSearchView(FormView, SearchEngineMixin):
         knowledges = (Znanie.objects.filter(is_published=True)
                       .order_by('name')
                       .select_related('author', 'tz', 'category')
-                      .prefetch_related('related__tr', 'labels'))
+                      .prefetch_related('related__tr', 'labels')
+                      .with_stats(user=self.request.user))
 
         extra_query = None
 
@@ -73,57 +75,10 @@ class KnowledgeSearchView(FormView, SearchEngineMixin):
             for query in tag_queries:
                 knowledges = knowledges.filter(query)
 
-        exclude_query = None
         if main_search_parameter:
-            # Ищем знания по главному полю
-            # Вначале необходимо получить наборы слов в виде общего списка
-            # После чего беру набор и ищу через или
-            parameter_value_combinations = self.get_parameter_combinations(
-                main_search_parameter)
-            combination_queries = []
-            for combination in parameter_value_combinations:
-                query_previously = None
-                for value in combination:
-                    query = Q(name__contains=value)
-                    query = query | Q(content__contains=value)
-                    query = query | Q(source_com__contains=value)
-
-                    if value != value.upper():
-                        query = query | Q(name__contains=value.upper())
-                        query = query | Q(content__contains=value.upper())
-                        query = query | Q(source_com__contains=value.upper())
-
-                    if value != value.lower():
-                        query = query | Q(name__contains=value.lower())
-                        query = query | Q(content__contains=value.lower())
-                        query = query | Q(source_com__contains=value.lower())
-
-                    if value != value.capitalize():
-                        query = query | Q(name__contains=value.capitalize())
-                        query = query | Q(content__contains=value.capitalize())
-                        query = query | Q(
-                            source_com__contains=value.capitalize())
-
-                    if query_previously:
-                        query = query & query_previously
-
-                    query_previously = query
-
-                if not exclude_query:
-                    combination_queries.append(query)
-                    exclude_query = ~query
-                else:
-                    combination_queries.append(query & exclude_query)
-                    exclude_query = ~query & exclude_query
-
-        if main_search_parameter:
-            knowledges_list = []
-            # Первые запросы в списке соответствуют комбинациям с большим количеством слов
-            # Этим добиваемся выдачи вначале знаний с большим совпадением слов
-            for query in combination_queries:
-                knowledges_tmp = knowledges.filter(query)
-                knowledges_list.extend(list(knowledges_tmp))
-            return knowledges_list
+            # Ищем знания по главному полю через поисковый индекс.
+            # Знания с большим количеством совпавших слов выводятся первыми
+            knowledges = search_knowledges(knowledges, main_search_parameter)
         return knowledges
 
     @classmethod
@@ -193,6 +148,8 @@ class KnowledgeSearchView(FormView, SearchEngineMixin):
                 tag_parameters=tag_parameters
             )
 
+            knowledges = self.get_cached_results(knowledges)
+
             paginator = Paginator(knowledges, 10)
 
             cur_page_number = self.request.GET.get('page')
@@ -1,3 +1,5 @@
+import functools
+import operator
 from django.urls import reverse_lazy
 from ..forms import *
 from django.views.generic.edit import FormView
@@ -6,6 +8,9 @@ from django.core.paginator import Paginator
 from django.db.models import (Q,
                               QuerySet,
                               Count,
+                              Case,
+                              When,
+                              IntegerField,
                               Value)
 from django.forms import formset_factory
 from .search_engine import SearchEngineMixin
@@ -29,45 +34,23 @@ class TagSearchView(FormView, SearchEngineMixin):
                 .filter(znanie__gt=0)
                 .order_by('name'))
 
-        # Ищем теги по главному полю
-        # Вначале необходимо получить наборы слов в виде общего списк
-        # После чего беру набор и ищу через или
-        parameter_value_combinations = self.get_parameter_combinations(
-            main_search_parameter)
-        exclude_query = None
-        combination_queries = []
-        for combination in parameter_value_combinations:
-            query_previously = None
-            for value in combination:
-                query = Q(name__contains=value)
-
-                if value != value.upper():
-                    query = query | Q(name__contains=value.upper())
-
-                if value != value.lower():
-                    query = query | Q(name__contains=value.lower())
-
-                if value != value.capitalize():
-                    query = query | Q(name__contains=value.capitalize())
-
-                if query_previously:
-                    query = query & query_previously
-
-                query_previously = query
-
-            if not exclude_query:
-                combination_queries.append(query)
-                exclude_query = ~query
-            else:
-                combination_queries.append(query & exclude_query)
-                exclude_query = ~query & exclude_query
-
-        tags_list = []
-        for query in combination_queries:
-            tags_tmp = tags.filter(query)
-            tags_list.extend(list(tags_tmp))
-
-        return tags_list
+        # Ищем теги по главному полю.
+        # Теги с большим количеством совпавших слов выводятся первыми
+        words = self.get_search_words(main_search_parameter)
+        if not words:
+            return tags.none()
+        search_rank = functools.reduce(operator.add, [
+            Case(When(name__lower__contains=word, then=Value(1)),
+                 default=Value(0),
+                 output_field=IntegerField())
+            for word in words
+        ])
+        tags = (tags
+                .annotate(search_rank=search_rank)
+                .filter(search_rank__gt=0)
+                .order_by('-search_rank', 'name'))
+
+        return tags
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -92,6 +75,8 @@ class TagSearchView(FormView, SearchEngineMixin):
                 main_search_parameter=main_search_parameter,
             )
 
+            tags = self.get_cached_results(tags)
+
             paginator = Paginator(tags, 10)
 
             cur_page_number = self.request.GET.get('page')
@@ -27,7 +27,9 @@ class ZnanieByLabelView(DetailView):
 
         label_id = int(self.kwargs['pk'])
         label = Label.objects.get(id=label_id)
-        knowledges_of_label = Znanie.published.filter(labels__in=[label])
+        knowledges_of_label = (Znanie.published
+                               .filter(labels__in=[label])
+                               .with_stats(user=self.request.user))
         context['categories'], context['knowledges'] = \
             get_knowledges_by_categories(knowledges_of_label)
 
@@ -1,11 +1,11 @@
 from django.views.generic import DetailView
-from ..models import Znanie, Relation, Tr, IP, Visits, Comment
-from ..models import Znanie, Relation, Tr, IP, Visits, Comment
+from ..models import Znanie, Relation, Tr, Comment
 from loguru import logger
 from ..relations_tree import (get_category_for_knowledge, get_ancestors_for_knowledge,
                               get_siblings_for_knowledge,
                               get_children_by_relation_type_for_knowledge)
 import humanize
+from ..visit_tracking import get_client_ip, record_visit
 
 
 logger.add('logs/main.log',
@@ -19,6 +19,8 @@ class ZnanieDetailView(DetailView):
     model = Znanie
     context_object_name = 'znanie'
     template_name = 'drevo/znanie_detail.html'
+    # число соседних знаний, выводимых до и после текущего знания
+    siblings_window = 10
 
     def get_context_data(self, *, object_list=None, **kwargs):
         """
@@ -38,25 +40,11 @@ class ZnanieDetailView(DetailView):
         context['rels'] = [[item.name, qs.filter(tr=item, rz__is_published=True)]
                            for item in ts if qs.filter(tr=item, rz__is_published=True).count() > 0]
 
-        # сохранение ip пользователя
-        knowledge = Znanie.objects.get(pk=pk)
-        x_forwarded_for = self.request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = self.request.META.get('REMOTE_ADDR')
-        if not IP.objects.filter(ip=ip):
-            IP.objects.create(ip=ip)
-        if knowledge not in IP.objects.get(ip=ip).visits.all() and self.request.user.is_anonymous:
-            IP.objects.get(ip=ip).visits.add(knowledge)
-
-        IP.objects.get(ip=ip).save()
+        knowledge = self.object
 
-        # добавление просмотра
-        if self.request.user.is_authenticated:
-            if not Visits.objects.filter(znanie=knowledge, user=self.request.user).count():
-                Visits.objects.create(
-                    znanie=knowledge, user=self.request.user).save()
+        # просмотр записывается в базу в фоновом потоке
+        user_id = self.request.user.pk if self.request.user.is_authenticated else None
+        record_visit(knowledge.pk, ip=get_client_ip(self.request), user_id=user_id)
 
         # формируем дерево категорий для категории текущего знания
         category = get_category_for_knowledge(knowledge)
@@ -68,12 +56,12 @@ class ZnanieDetailView(DetailView):
         context['category'] = category
         context['categories'] = categories
         context['chain'] = get_ancestors_for_knowledge(knowledge)
-        context['siblings'] = get_siblings_for_knowledge(knowledge)
+        context['siblings'] = get_siblings_for_knowledge(
+            knowledge, window=self.siblings_window)
         # context['children'] = get_children_for_knowledge(knowledge)
         context['children_by_tr'] = get_children_by_relation_type_for_knowledge(
             knowledge)
-        context['visits'] = Visits.objects.filter(
-            znanie=knowledge).count() + knowledge.ip_set.all().count()
+        context['visits'] = knowledge.visits_count
 
         user = self.request.user
         if user.is_authenticated:
@@ -0,0 +1,194 @@
+"""
+Учет просмотров знаний.
+
+Страница знания не записывает просмотр в базу сама: record_visit
+помещает просмотр в очередь процесса, которую разбирает фоновый поток.
+Поток собирает просмотры в пакеты (до BATCH_SIZE просмотров или
+FLUSH_INTERVAL секунд), отбрасывает повторы и сохраняет пакет
+несколькими запросами (см. write_visits).
+
+При VISITS_ASYNC = False (настройка проекта) просмотр записывается сразу.
+"""
+import atexit
+import collections
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from loguru import logger
+
+from .models import IP, Visits, Znanie
+
+# Наибольший размер пакета просмотров
+BATCH_SIZE = 500
+# Наибольшее время ожидания пакета, сек.
+FLUSH_INTERVAL = 2
+
+Visit = collections.namedtuple('Visit', ('knowledge_id', 'ip', 'user_id'))
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+def record_visit(knowledge_id, ip=None, user_id=None):
+    """
+    Регистрирует просмотр знания пользователем user_id, а для анонимного
+    пользователя - просмотр с адреса ip.
+    """
+    visit = Visit(knowledge_id, None if user_id else ip, user_id)
+    if not getattr(settings, 'VISITS_ASYNC', True):
+        write_visits([visit])
+        return
+    _start_worker()
+    _queue.put(visit)
+
+
+def write_visits(visits):
+    """
+    Сохраняет пакет просмотров, пропуская уже учтенные, и увеличивает
+    счетчики просмотров знаний (Znanie.visits_count).
+    """
+    visits = set(visits)
+    ip_visits = {(IP.pack(visit.ip), visit.knowledge_id) for visit in visits
+                 if not visit.user_id}
+    # некорректные адреса не учитываются
+    ip_visits = {(ip, knowledge_id) for ip, knowledge_id in ip_visits if ip}
+    user_visits = {(visit.user_id, visit.knowledge_id) for visit in visits
+                   if visit.user_id}
+
+    new_visits = collections.Counter()
+    with transaction.atomic():
+        if ip_visits:
+            new_visits.update(_write_ip_visits(ip_visits))
+        if user_visits:
+            new_visits.update(_write_user_visits(user_visits))
+        _increment_visits_counts(new_visits)
+
+
+def _write_ip_visits(ip_visits):
+    # Адреса и просмотры вставляются с пропуском уже существующих
+    # (уникальные индексы по IP.ip и по паре адрес-знание), поэтому
+    # одновременная запись из нескольких процессов не создает повторов
+    addresses = {ip for ip, _ in ip_visits}
+    IP.objects.bulk_create((IP(ip=ip) for ip in addresses), ignore_conflicts=True)
+    ip_ids = {bytes(ip): pk for ip, pk in IP.objects
+                                           .filter(ip__in=addresses)
+                                           .values_list('ip', 'pk')}
+
+    IPVisit = IP.visits.through
+    pairs = {(ip_ids[ip], knowledge_id) for ip, knowledge_id in ip_visits}
+    existing = set(IPVisit.objects
+                   .filter(ip_id__in={ip_id for ip_id, _ in pairs},
+                           znanie_id__in={knowledge_id for _, knowledge_id in pairs})
+                   .values_list('ip_id', 'znanie_id'))
+    new_pairs = pairs - existing
+    IPVisit.objects.bulk_create(
+        (IPVisit(ip_id=ip_id, znanie_id=knowledge_id)
+         for ip_id, knowledge_id in new_pairs),
+        ignore_conflicts=True
+    )
+    return collections.Counter(knowledge_id for _, knowledge_id in new_pairs)
+
+
+def _write_user_visits(user_visits):
+    existing = set(Visits.objects
+                   .filter(user_id__in={user_id for user_id, _ in user_visits},
+                           znanie_id__in={knowledge_id for _, knowledge_id in user_visits})
+                   .values_list('user_id', 'znanie_id'))
+    new_visits = user_visits - existing
+    Visits.objects.bulk_create(
+        (Visits(user_id=user_id, znanie_id=knowledge_id)
+         for user_id, knowledge_id in new_visits),
+        ignore_conflicts=True
+    )
+    return collections.Counter(knowledge_id for _, knowledge_id in new_visits)
+
+
+def _increment_visits_counts(new_visits):
+    """
+    Увеличивает счетчики просмотров знаний, одним запросом на каждую
+    встретившуюся величину прироста.
+    """
+    knowledge_ids_by_increment = collections.defaultdict(list)
+    for knowledge_id, increment in new_visits.items():
+        knowledge_ids_by_increment[increment].append(knowledge_id)
+    for increment, knowledge_ids in knowledge_ids_by_increment.items():
+        (Znanie.objects
+         .filter(pk__in=knowledge_ids)
+         .update(visits_count=F('visits_count') + increment))
+
+
+def rebuild_visits_counts():
+    """
+    Пересчитывает счетчики просмотров всех знаний по Visits и IP.
+    """
+    def count_visits(model):
+        return Coalesce(Subquery(model.objects
+                                 .filter(znanie=OuterRef('pk'))
+                                 .order_by()
+                                 .values('znanie')
+                                 .annotate(count=Count('pk'))
+                                 .values('count')),
+                        0)
+
+    return Znanie.objects.update(
+        visits_count=count_visits(Visits) + count_visits(IP.visits.through))
+
+
+def flush_visits():
+    """
+    Записывает все просмотры из очереди в текущем потоке.
+    """
+    visits = []
+    while True:
+        try:
+            visits.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    if visits:
+        write_visits(visits)
+
+
+def _start_worker():
+    global _worker
+    if _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_process_queue,
+                                       name='visit-tracking',
+                                       daemon=True)
+            _worker.start()
+            atexit.register(flush_visits)
+
+
+def _process_queue():
+    while True:
+        batch = [_queue.get()]
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        try:
+            write_visits(batch)
+        except Exception:
+            logger.exception('Не удалось сохранить просмотры знаний')
+        finally:
+            close_old_connections()
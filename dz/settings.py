@@ -2,6 +2,7 @@
 Django settings for dz project.
 """
 import os
+import sys
 from pathlib import Path
 from environs import Env
 import dj_database_url
@@ -75,6 +76,13 @@ WSGI_APPLICATION = 'dz.wsgi.application'
 
 DATABASES = {"default": env.dj_db_url("DB_URL")}
 
+CACHES = {
+    'default': {
+        'BACKEND': env.str('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env.str('CACHE_LOCATION', ''),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -131,6 +139,19 @@ MEDIA_URL = '/media/'
 
 LOGIN_URL = '/users/login/'
 
+# Запись просмотров знаний в фоновом потоке (см. drevo/visit_tracking.py).
+# При запуске тестов просмотры записываются сразу, в транзакции теста
+TESTING = sys.argv[1:2] == ['test']
+VISITS_ASYNC = env.bool('VISITS_ASYNC', not TESTING)
+
+# Снимок графа знаний в памяти процесса (см. drevo/knowledge_graph.py)
+KNOWLEDGE_GRAPH_SNAPSHOT = env.bool('KNOWLEDGE_GRAPH_SNAPSHOT', False)
+# Как часто проверять версию графа, сек.
+KNOWLEDGE_GRAPH_CHECK_INTERVAL = env.float('KNOWLEDGE_GRAPH_CHECK_INTERVAL', 1)
+
+# Формат уменьшенных копий изображений (см. drevo/thumbnails.py)
+THUMBNAIL_FORMAT = env.str('THUMBNAIL_FORMAT', 'WEBP')
+
 BASE_URL = env.str('BASE_URL')
 
 if not DEBUG: